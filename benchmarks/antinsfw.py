@@ -0,0 +1,93 @@
+"""Agreement check and micro-benchmark for the anti-NSFW keyword matcher.
+
+Run from the repository root:
+
+    python -m benchmarks.antinsfw
+
+Exits non-zero if the matcher and the old keyword loop disagree on any name.
+pyrogram is only needed by the plugin's command handler, so the keyword lists
+are read from the plugin's source instead of importing it.
+"""
+import ast
+import sys
+import timeit
+from pathlib import Path
+
+from benchmarks.filename_parser import GOLDEN_CORPUS
+from helper.keyword_matcher import KeywordMatcher
+
+PLUGIN = Path(__file__).resolve().parent.parent / "plugins" / "antinsfw.py"
+
+
+def load_keyword_lists():
+    lists = {}
+    for node in ast.parse(PLUGIN.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id in ("nsfw_keywords", "exception_keywords"):
+                lists[node.targets[0].id] = ast.literal_eval(node.value)
+    return lists["nsfw_keywords"], lists["exception_keywords"]
+
+
+NSFW_KEYWORDS, EXCEPTION_KEYWORDS = load_keyword_lists()
+
+EXTRA_NAMES = [
+    "Assassination Classroom S02E05 1080p.mkv",
+    "Code Geass - 25 [720p].mkv",
+    "Bass Boosted Mix 320kbps.mp3",
+    "Project Document Final.pdf",
+    "Adult Swim Promo 480p.mp4",
+    "[Group] Some Hentai Title - 03 [1080p].mkv",
+    "Pop Culture Review.mp4",
+    "NXIVM The Vow S01E01.mkv",
+    "Butterfly Effect 2004 1080p.mkv",
+    "S3XUAL stuff.mkv",
+]
+NAMES = [name for name, _ in GOLDEN_CORPUS] + EXTRA_NAMES
+
+
+def legacy_check(new_name):
+    """The loop check_anti_nsfw ran before the matcher, minus the reply."""
+    lower_name = new_name.lower()
+    for keyword in EXCEPTION_KEYWORDS:
+        if keyword.lower() in lower_name:
+            return None
+    for category, keywords in NSFW_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword.lower() in lower_name:
+                return category
+    return None
+
+
+def check_agreement(matcher):
+    failures = 0
+    for name in NAMES:
+        expected, got = legacy_check(name), matcher.match(name)
+        if got != expected:
+            failures += 1
+            print(f"FAIL {name!r}: legacy {expected}, matcher {got}")
+    blocked = sum(legacy_check(name) is not None for name in NAMES)
+    print(f"{len(NAMES)} names, {blocked} blocked, {failures} disagreements")
+    return failures
+
+
+def benchmark(matcher, number=300, repeat=15):
+    contenders = [("legacy loop", legacy_check), ("matcher", matcher.match)]
+    best = {label: float("inf") for label, _ in contenders}
+    # Interleave the runs so machine noise hits every contender alike.
+    for _ in range(repeat):
+        for label, check in contenders:
+            elapsed = timeit.timeit(lambda: [check(name) for name in NAMES], number=number)
+            best[label] = min(best[label], elapsed)
+    per_name = 1e6 / (number * len(NAMES))
+    for label, _ in contenders:
+        print(f"{label:12}: {best[label] * per_name:6.2f} us/name")
+    print(f"matcher is {best['legacy loop'] / best['matcher']:.2f}x faster")
+    build = min(timeit.repeat(lambda: KeywordMatcher(NSFW_KEYWORDS, EXCEPTION_KEYWORDS), number=10, repeat=5)) / 10
+    print(f"building the matcher ({len(matcher.keywords)} keywords): {build * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    matcher = KeywordMatcher(NSFW_KEYWORDS, EXCEPTION_KEYWORDS)
+    failed = check_agreement(matcher)
+    benchmark(matcher)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,177 @@
+"""Golden-corpus check and micro-benchmark for helper.filename_parser.
+
+Run from the repository root:
+
+    python -m benchmarks.filename_parser
+
+Exits non-zero if the single-pass parser disagrees with the golden corpus.
+"""
+import re
+import sys
+import timeit
+
+from helper.filename_parser import parse_filename, scan_filename
+
+# (release name, (season, episode, quality))
+GOLDEN_CORPUS = [
+    ("[SubsPlease] Jujutsu Kaisen - 24 (1080p) [5D3A2B1C].mkv", (None, "24", "1080p")),
+    ("Attack.on.Titan.S04E28.1080p.WEB.H264-SENPAI.mkv", ("04", "28", "1080p")),
+    ("One Piece Episode 1071 [720p].mkv", (None, "1071", "720p")),
+    ("[Erai-raws] Spy x Family Season 2 - 05 [1080p][Multiple Subtitle][ABCDEF01].mkv", ("2", "05", "1080p")),
+    ("Naruto Shippuden S01 EP05 480p.mkv", ("01", "05", "480p")),
+    ("The.Mandalorian.s03e08.2160p.WEB-DL.x265.mkv", ("03", "08", "2160p")),
+    ("Demon Slayer [S-03] [E-11] [Dual] 720p.mkv", ("03", "11", "720p")),
+    ("Demon Slayer [S03] [E11] 1080p HEVC.mkv", ("03", "11", "1080p")),
+    ("[Season 1] [Episode 12] Overlord 720p.mkv", ("1", "12", "720p")),
+    ("Overlord Season 4 Episode 13 [Hindi] 480p.mkv", ("4", "13", "480p")),
+    ("Bleach S-02 E-14 HDRip.mp4", ("02", "14", "720p")),
+    ("Black Clover Ep-170 1080p.mkv", (None, "170", "1080p")),
+    ("Black Clover Episode-170 [HD].mkv", (None, "170", "720p")),
+    ("Solo Leveling E07 4K.mkv", (None, "07", "4k")),
+    ("Solo Leveling - 07 [4k].mkv", (None, "07", "4k")),
+    ("Frieren S01 - 28 [1080p].mkv", ("01", "28", "1080p")),
+    ("Frieren S01 [1080p] Batch.mkv", ("01", None, "1080p")),
+    ("Mashle 2x05 720p.mkv", ("2", "05", "720p")),
+    ("Chainsaw Man - 12v2 (1080p).mkv", (None, "12", "1080p")),
+    ("Blue Lock - 2023 - 05 [720p].mkv", (None, "05", "720p")),
+    ("Your Name (2016) 1080p BluRay x264.mkv", (None, None, "1080p")),
+    ("Vinland Saga S02E24 HEVC.mkv", ("02", "24", "1080p")),
+    ("Oshi no Ko S2 E11 [SD].mkv", ("2", "11", "480p")),
+    ("Tokyo Revengers [Season 3] 720p.mkv", ("3", None, "720p")),
+    ("Dr.Stone.S03E22.720p.HDTV.mkv", ("03", "22", "720p")),
+    ("Kaiju No 8 - 09 [UHD].mkv", (None, "09", "4k")),
+    ("Dandadan EP 03 [2K].mkv", (None, "03", "2k")),
+    ("[Judas] Hunter x Hunter - 148 [1080p][HEVC x265 10bit].mkv", (None, "148", "1080p")),
+    ("Re Zero S3 E05 [480p] [Dual Audio].mkv", ("3", "05", "480p")),
+    ("Haikyuu S04E25 1080P.mkv", ("04", "25", "1080p")),
+    ("Spirited Away 2001 [1080p].mkv", (None, None, "1080p")),
+    ("My Hero Academia S07E01 [Sub] 1440p.mkv", ("07", "01", "1440p")),
+    ("Classroom of the Elite S03 E13 1080p.mkv", ("03", "13", "1080p")),
+    ("Wind Breaker Episode 5 HD.mp4", (None, "5", "720p")),
+    ("Boruto - 293 [360p].mkv", (None, "293", "360p")),
+    ("Song Title - Artist 320kbps.mp3", (None, None, "Unknown")),
+    ("random_document.pdf", (None, None, "Unknown")),
+]
+
+# The sequential pattern lists plugins/file_rename.py used before the single-pass parser.
+LEGACY_SEASON_EPISODE_PATTERNS = [
+    (re.compile(r'S(\d+)(?:E|EP)(\d+)'), ('season', 'episode')),
+    (re.compile(r'S(\d+)[\s-]*(?:E|EP)(\d+)'), ('season', 'episode')),
+    (re.compile(r'Season\s*(\d+)\s*Episode\s*(\d+)', re.IGNORECASE), ('season', 'episode')),
+    (re.compile(r'S(\d+)E(\d+)'), ('season', 'episode')),
+    (re.compile(r'S(\d+)[^\d]*(\d+)'), ('season', 'episode')),
+    (re.compile(r'(?:E|EP|Episode)\s*(\d+)', re.IGNORECASE), (None, 'episode')),
+    (re.compile(r'\b(\d+)\b'), (None, 'episode')),
+    (re.compile(r'\[S-(\d+)\]\s*\[E-(\d+)\]'), ('season', 'episode')),
+    (re.compile(r'\[S(\d+)\]\s*\[E(\d+)\]'), ('season', 'episode')),
+    (re.compile(r'\[Season\s*(\d+)\]\s*\[Episode\s*(\d+)\]', re.IGNORECASE), ('season', 'episode')),
+    (re.compile(r'\bS-(\d+)\b\s*\bE-(\d+)\b'), ('season', 'episode')),
+    (re.compile(r'\b(?:Ep|EP|E|-E|E-)(\d+)\b', re.IGNORECASE), (None, 'episode')),
+    (re.compile(r'\bEp-(\d+)\b', re.IGNORECASE), (None, 'episode')),
+    (re.compile(r'\bEpisode-(\d+)\b', re.IGNORECASE), (None, 'episode')),
+    (re.compile(r'\[S-(\d+)\]'), ('season', None)),
+    (re.compile(r'\[Season\s*(\d+)\]', re.IGNORECASE), ('season', None)),
+    (re.compile(r'\bS-(\d+)\b'), ('season', None)),
+]
+
+LEGACY_QUALITY_PATTERNS = [
+    (re.compile(r'\b(\d{3,4}[pi])\b', re.IGNORECASE), lambda m: m.group(1).lower()),
+    (re.compile(r'\[(\d{3,4}[pi])\]', re.IGNORECASE), lambda m: m.group(1).lower()),
+    (re.compile(r'\b(4k|2160p)\b', re.IGNORECASE), lambda m: "4k"),
+    (re.compile(r'\[(4k|2160p)\]', re.IGNORECASE), lambda m: "4k"),
+    (re.compile(r'\b(2k|1440p)\b', re.IGNORECASE), lambda m: "2k"),
+    (re.compile(r'\[(2k|1440p)\]', re.IGNORECASE), lambda m: "2k"),
+    (re.compile(r'\b(360p)\b', re.IGNORECASE), lambda m: "360p"),
+    (re.compile(r'\[360p\]', re.IGNORECASE), lambda m: "360p"),
+    (re.compile(r'\bSD\b', re.IGNORECASE), lambda m: "480p"),
+    (re.compile(r'\[SD\]', re.IGNORECASE), lambda m: "480p"),
+    (re.compile(r'\bHD\b', re.IGNORECASE), lambda m: "720p"),
+    (re.compile(r'\[HD\]', re.IGNORECASE), lambda m: "720p"),
+    (re.compile(r'\b(UHD|4kX264|4kx265)\b', re.IGNORECASE), lambda m: "4k"),
+    (re.compile(r'\[(UHD|4kX264|4kx265)\]', re.IGNORECASE), lambda m: "4k"),
+    (re.compile(r'\b(HDRip|HDTV)\b', re.IGNORECASE), lambda m: "720p"),
+    (re.compile(r'\b(X264|X265|HEVC)\b', re.IGNORECASE), lambda m: "1080p"),
+    (re.compile(r'(\d{3,4}[pi])', re.IGNORECASE), lambda m: m.group(1).lower()),
+]
+
+
+def legacy_extract_season_episode(filename):
+    for pattern, (season_group, episode_group) in LEGACY_SEASON_EPISODE_PATTERNS:
+        match = pattern.search(filename)
+        if match:
+            season = match.group(1) if season_group else None
+            episode = match.group(2) if episode_group else match.group(1) if episode_group else None
+            return season, episode
+    return None, None
+
+
+def legacy_extract_quality(filename):
+    for pattern, extractor in LEGACY_QUALITY_PATTERNS:
+        match = pattern.search(filename)
+        if match:
+            return extractor(match)
+    return "Unknown"
+
+
+def legacy_parse(filename):
+    try:
+        season, episode = legacy_extract_season_episode(filename)
+    except IndexError:
+        # Episode-only patterns have one group, so the old code raised "no such group".
+        return "error"
+    return season, episode, legacy_extract_quality(filename)
+
+
+def legacy_parse_fixed(filename):
+    """The legacy cascade with its group bug fixed, i.e. doing the work it was meant to do."""
+    season = episode = None
+    for pattern, (season_group, episode_group) in LEGACY_SEASON_EPISODE_PATTERNS:
+        match = pattern.search(filename)
+        if match:
+            season = match.group(1) if season_group else None
+            episode = match.group(match.lastindex) if episode_group else None
+            break
+    return season, episode, legacy_extract_quality(filename)
+
+
+def check_corpus():
+    failures = improved = 0
+    for name, expected in GOLDEN_CORPUS:
+        got = parse_filename(name)
+        legacy = legacy_parse(name)
+        if got != expected:
+            failures += 1
+            print(f"FAIL     {name!r}: expected {expected}, got {got}")
+        elif legacy != expected:
+            improved += 1
+            print(f"IMPROVED {name!r}: legacy {legacy}, now {got}")
+    print(f"\n{len(GOLDEN_CORPUS)} names, {failures} failures, {improved} improved over the legacy cascade")
+    return failures
+
+
+def benchmark(number=300, repeat=15):
+    names = [name for name, _ in GOLDEN_CORPUS]
+    contenders = [
+        ("legacy cascade", legacy_parse),
+        ("legacy, bug fixed", legacy_parse_fixed),
+        ("single pass", scan_filename),
+        ("memoized", parse_filename),
+    ]
+    best = {label: float("inf") for label, _ in contenders}
+    # Interleave the runs so machine noise hits every contender alike.
+    for _ in range(repeat):
+        for label, parse in contenders:
+            elapsed = timeit.timeit(lambda: [parse(name) for name in names], number=number)
+            best[label] = min(best[label], elapsed)
+    per_name = 1e6 / (number * len(names))
+    for label, _ in contenders:
+        line = f"{label:18}: {best[label] * per_name:6.2f} us/name"
+        if label.startswith("legacy"):
+            line += f"  (single pass is {best[label] / best['single pass']:.2f}x faster)"
+        print(line)
+
+
+if __name__ == "__main__":
+    failed = check_corpus()
+    benchmark()
+    sys.exit(1 if failed else 0)
@@ -3,9 +3,14 @@ from datetime import datetime, timedelta
 from pytz import timezone
 from pyrogram import Client, __version__
 from pyrogram.raw.all import layer
+from pyrogram.handlers import RawUpdateHandler
 from config import Config
 from aiohttp import web
 from route import web_server
+from helper.executor import loop_monitor
+from helper.database import codeflixbots
+from helper.scheduler import rename_scheduler
+from helper.upload_pool import upload_pool
 import pyrogram.utils
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import os
@@ -42,33 +47,38 @@ class Bot(Client):
 
             await asyncio.sleep(300)
 
-    async def start(self):
-        await super().start()
-        me = await self.get_me()
-        self.mention = me.mention
-        self.username = me.username  
-        self.uptime = Config.BOT_UPTIME  
+    async def _phase(self, name, coro):
+        """Await ``coro`` and record how long it took under ``name`` in ``startup_timings``."""
+        started = time.monotonic()
+        try:
+            return await coro
+        finally:
+            self.startup_timings[name] = time.monotonic() - started
 
-        if Config.WEBHOOK:
-            app = web.AppRunner(await web_server())
-            await app.setup()       
-            await web.TCPSite(app, "0.0.0.0", 8080).start()     
+    async def _first_update(self, client, update, users, chats):
+        # Runs ahead of every plugin handler, once: time from process start to the first update.
+        if "first_update" not in self.startup_timings:
+            self.startup_timings["first_update"] = time.time() - self.start_time
+            print(f"⏱ First update {self.startup_timings['first_update']:.2f}s after launch")
+            self.remove_handler(*self._first_update_handler)
 
-        print(f"{me.first_name} Is Started.....✨️")
-        print("✅ Bot started.")
+    async def start_web_server(self):
+        app = web.AppRunner(await web_server())
+        await app.setup()
+        await web.TCPSite(app, "0.0.0.0", 8080).start()
 
-        # Send log message
-        try:
-            await self.send_message(Config.LOG_CHANNEL, "✅ Bot is online!")
-        except Exception as e:
-            print(f"Failed to send bot online message: {e}")
+    async def announce(self):
+        """Tell the log and support chats the bot is back; runs in the background."""
+        uptime_string = str(timedelta(seconds=int(time.time() - self.start_time)))
 
-        uptime_seconds = int(time.time() - self.start_time)
-        uptime_string = str(timedelta(seconds=uptime_seconds))
+        async def send_online():
+            try:
+                await self.send_message(Config.LOG_CHANNEL, "✅ Bot is online!")
+            except Exception as e:
+                print(f"Failed to send bot online message: {e}")
 
-        for chat_id in [Config.LOG_CHANNEL, SUPPORT_CHAT]:
+        async def send_restart_photo(chat_id):
             try:
-                curr = datetime.now(timezone("Asia/Kolkata"))
                 await self.send_photo(
                     chat_id=chat_id,
                     photo=Config.START_PIC,
@@ -85,9 +95,60 @@ class Bot(Client):
             except Exception as e:
                 print(f"Failed to send message in chat {chat_id}: {e}")
 
+        await asyncio.gather(send_online(), *(send_restart_photo(chat_id) for chat_id in [Config.LOG_CHANNEL, SUPPORT_CHAT]))
+
+    async def start(self):
+        self.startup_timings = {}
+        self._first_update_handler = (RawUpdateHandler(self._first_update), -1)
+        # Clear out the previous run's leftovers while no handler can start a job.
+        from plugins.file_rename import sweep_artifacts, recover_jobs
+        try:
+            await self._phase("sweep", sweep_artifacts())
+        except Exception as e:
+            print(f"Skipped sweeping leftover files, journal unreadable: {e}")
+        await self._phase("connect", super().start())
+        self.add_handler(*self._first_update_handler)
+
+        # Nothing here depends on anything else here, so it all runs at once.
+        phases = [
+            self._phase("get_me", self.get_me()),
+            self._phase("db_ping", codeflixbots.ping()),
+            self._phase("indexes", codeflixbots.ensure_indexes()),
+            self._phase("known_users", codeflixbots.warm_known_users()),
+            self._phase("leaderboard", codeflixbots.get_top_renamers(Config.LEADERBOARD_SIZE)),
+            self._phase("upload_pool", upload_pool.start()),
+        ]
+        if Config.WEBHOOK:
+            phases.append(self._phase("web_server", self.start_web_server()))
+        me, *_ = await self._phase("ready", asyncio.gather(*phases))
+        self.mention = me.mention
+        self.username = me.username  
+        self.uptime = Config.BOT_UPTIME  
+        codeflixbots.counters.start()
+
+        # Pick up jobs the previous run didn't finish.
+        try:
+            await self._phase("recover_jobs", recover_jobs(self))
+        except Exception as e:
+            print(f"Failed to recover jobs: {e}")
+
+        print(f"{me.first_name} Is Started.....✨️")
+        print("✅ Bot started.")
+        print("⏱ Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.startup_timings.items()))
+
+        asyncio.create_task(self.announce())
         asyncio.create_task(self.ping_service())
+        loop_monitor.start(debug=Config.LOOP_DEBUG)
 
     async def stop(self, *args):
+        # Let running jobs finish; what doesn't make the deadline is journaled and resumed on start.
+        cancelled = await rename_scheduler.drain(Config.DRAIN_TIMEOUT)
+        if cancelled:
+            print(f"⏸ {cancelled} jobs checkpointed for the next start.")
+        # Jobs are done now, so this writes every rename count they buffered.
+        await codeflixbots.counters.stop()
+        await upload_pool.stop()
+        loop_monitor.stop()
         print("🛑 Bot stopped.")
         return await super().stop()
 
@@ -27,6 +27,57 @@ class Config(object):
     # wes response configuration     
     WEBHOOK = bool(os.environ.get("WEBHOOK", "True"))
 
+    # user profile cache (seconds / entries)
+    PROFILE_CACHE_TTL  = int(os.environ.get("PROFILE_CACHE_TTL", "300"))
+    PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "5000"))
+
+    # rename job queue
+    MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "8"))
+    MAX_JOBS_PER_USER   = int(os.environ.get("MAX_JOBS_PER_USER", "3"))
+    DISK_HEADROOM_MB    = int(os.environ.get("DISK_HEADROOM_MB", "200"))
+    PARSE_CACHE_SIZE    = int(os.environ.get("PARSE_CACHE_SIZE", "4096"))
+    # seconds /restart and SIGTERM wait for running jobs (Render/Heroku kill after ~30s)
+    DRAIN_TIMEOUT       = int(os.environ.get("DRAIN_TIMEOUT", "25"))
+    # jobs running each stage at once, and jobs allowed to queue for it;
+    # STAGE_NET_OUT is per upload session (the bot plus each UPLOAD_BOT_TOKENS session)
+    STAGE_NET_IN        = int(os.environ.get("STAGE_NET_IN", "3"))
+    STAGE_CPU           = int(os.environ.get("STAGE_CPU", "2"))
+    STAGE_NET_OUT       = int(os.environ.get("STAGE_NET_OUT", "3"))
+    STAGE_BACKLOG       = int(os.environ.get("STAGE_BACKLOG", "2"))
+    # extra bot sessions for uploads, space separated; they post to RELAY_CHANNEL
+    # and the main bot (a member there too) copies the post to the user
+    UPLOAD_BOT_TOKENS    = os.environ.get("UPLOAD_BOT_TOKENS", "").split()
+    RELAY_CHANNEL        = int(os.environ.get("RELAY_CHANNEL", "0"))
+    UPLOAD_POOL_STRATEGY = os.environ.get("UPLOAD_POOL_STRATEGY", "least_loaded")
+    # broadcasts: messages per second (Telegram allows bots about 30), parallel sends, users per checkpoint
+    BROADCAST_RATE        = float(os.environ.get("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "20"))
+    BROADCAST_BATCH       = int(os.environ.get("BROADCAST_BATCH", "500"))
+    # force-subscribe membership cache (seconds / entries)
+    FSUB_CACHE_TTL        = int(os.environ.get("FSUB_CACHE_TTL", "600"))
+    FSUB_NEGATIVE_TTL     = int(os.environ.get("FSUB_NEGATIVE_TTL", "30"))
+    FSUB_CACHE_SIZE       = int(os.environ.get("FSUB_CACHE_SIZE", "20000"))
+    # albums close this many seconds after their last file; /batch windows after the timeout
+    BATCH_DEBOUNCE       = float(os.environ.get("BATCH_DEBOUNCE", "2"))
+    BATCH_WINDOW_TIMEOUT = int(os.environ.get("BATCH_WINDOW_TIMEOUT", "600"))
+    # pipe downloads straight into ffmpeg for containers that don't need seeking
+    STREAM_REMUX        = os.environ.get("STREAM_REMUX", "True").lower() == "true"
+    THUMB_CACHE_MB      = int(os.environ.get("THUMB_CACHE_MB", "50"))
+    PROGRESS_INTERVAL   = float(os.environ.get("PROGRESS_INTERVAL", "5"))
+    RESULT_CACHE_TTL    = int(os.environ.get("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+    # users kept in the in-memory leaderboard
+    LEADERBOARD_SIZE    = int(os.environ.get("LEADERBOARD_SIZE", "10"))
+    # rename counts are written in batches this often (seconds), or once this many users are pending
+    COUNTER_FLUSH_INTERVAL = float(os.environ.get("COUNTER_FLUSH_INTERVAL", "5"))
+    COUNTER_FLUSH_SIZE     = int(os.environ.get("COUNTER_FLUSH_SIZE", "500"))
+
+    # blocking work off the event loop
+    BLOCKING_WORKERS      = int(os.environ.get("BLOCKING_WORKERS", "4"))
+    LOOP_LAG_THRESHOLD_MS = int(os.environ.get("LOOP_LAG_THRESHOLD_MS", "100"))
+    LOOP_DEBUG            = os.environ.get("LOOP_DEBUG", "False").lower() == "true"
+    # optional JSON keyword lists for the NSFW filter, reloaded with /reload_nsfw
+    NSFW_KEYWORDS_FILE    = os.environ.get("NSFW_KEYWORDS_FILE", "nsfw_keywords.json")
+
 
 class Txt(object):
     # part of text configuration
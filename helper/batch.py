@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCollector:
+    """Groups incoming items by key and hands each group to ``on_batch``.
+
+    Album keys close ``debounce`` seconds after their last item arrived, since
+    Telegram delivers an album as separate messages in quick succession. A
+    user's ``/batch`` window stays open until ``close`` is called, or until
+    ``window_timeout`` seconds have passed. Items added under a window that
+    closed in the meantime are not stranded: they go into a debounced batch
+    of their own, which runs after the closed one.
+    """
+
+    def __init__(self, on_batch, debounce=2.0, window_timeout=600):
+        self.on_batch = on_batch
+        self.debounce = debounce
+        self.window_timeout = window_timeout
+        self._items = {}  # key -> items collected so far, in arrival order
+        self._timers = {}  # key -> TimerHandle that closes it
+        self._windows = {}  # user_id -> key of the user's open /batch window
+        self._tasks = set()
+        self._window_ids = itertools.count()
+
+    def open_window(self, user_id):
+        # Every window gets its own key, so a late item can tell its window is gone.
+        key = self._windows.get(user_id) or ("window", user_id, next(self._window_ids))
+        self._windows[user_id] = key
+        self._items.setdefault(key, [])
+        self._schedule(key, self.window_timeout)
+        return key
+
+    def window_for(self, user_id):
+        return self._windows.get(user_id)
+
+    def add(self, key, item):
+        if key[0] == "window" and self._windows.get(key[1]) != key:
+            key = ("late", key[1])
+        self._items.setdefault(key, []).append(item)
+        if key[0] != "window":
+            self._schedule(key, self.debounce)
+
+    def close(self, key):
+        """Close ``key`` now and hand its items over. Returns how many there were."""
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        if key[0] == "window":
+            self._windows.pop(key[1], None)
+        items = self._items.pop(key, [])
+        if items:
+            task = asyncio.create_task(self.on_batch(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return len(items)
+
+    def _schedule(self, key, delay):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        self._timers[key] = asyncio.get_running_loop().call_later(delay, self.close, key)
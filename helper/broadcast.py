@@ -0,0 +1,199 @@
+import time
+import asyncio
+import logging
+import datetime
+from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
+from config import Config
+from helper.database import codeflixbots
+
+logger = logging.getLogger(__name__)
+
+SENT, DEAD, FAILED = 200, 400, 500
+
+
+class TokenBucket:
+    """Allows ``rate`` operations per second with bursts of up to ``capacity``.
+    ``pause`` stops everyone for a while, e.g. for the length of a FloodWait."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def take(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def send_msg(client, user_id, from_chat_id, message_id, bucket, retries=3):
+    for _ in range(retries + 1):
+        await bucket.take()
+        try:
+            await client.copy_message(chat_id=int(user_id), from_chat_id=from_chat_id, message_id=message_id)
+            return SENT
+        except FloodWait as e:
+            # Flood limits are per bot, so every sender backs off, then this one retries.
+            bucket.pause(e.value)
+        except InputUserDeactivated:
+            logger.info(f"{user_id} : Deactivated")
+            return DEAD
+        except UserIsBlocked:
+            logger.info(f"{user_id} : Blocked The Bot")
+            return DEAD
+        except PeerIdInvalid:
+            logger.info(f"{user_id} : User ID Invalid")
+            return DEAD
+        except Exception as e:
+            logger.error(f"{user_id} : {e}")
+            return FAILED
+    return FAILED
+
+
+class BroadcastRunner:
+    """Copies one message to every user, ``batch_size`` ids at a time.
+
+    After each batch the dead users are deleted in one query and the position
+    is saved to the ``broadcasts`` collection, so a cancelled or interrupted
+    broadcast can resume where it stopped.
+    """
+
+    def __init__(self, client, broadcast, status_message=None):
+        self.client = client
+        self.broadcast = broadcast
+        self.status_message = status_message
+        self.cancelled = False
+        self.bucket = TokenBucket(Config.BROADCAST_RATE)
+        self._sending = asyncio.Semaphore(Config.BROADCAST_CONCURRENCY)
+
+    @property
+    def id(self):
+        return self.broadcast["_id"]
+
+    async def _send(self, user_id):
+        async with self._sending:
+            if self.cancelled:
+                return None
+            return await send_msg(self.client, user_id, self.broadcast["from_chat_id"], self.broadcast["message_id"], self.bucket)
+
+    async def _send_batch(self, user_ids):
+        b = self.broadcast
+        results = await asyncio.gather(*(self._send(user_id) for user_id in user_ids))
+        # Only the leading run of attempted users counts as done; the rest are retried on resume.
+        done = next((i for i, result in enumerate(results) if result is None), len(results))
+        results, user_ids = results[:done], user_ids[:done]
+
+        dead = [user_id for user_id, result in zip(user_ids, results) if result == DEAD]
+        if dead:
+            b["removed"] += await codeflixbots.delete_users(dead)
+        b["done"] += done
+        b["success"] += results.count(SENT)
+        b["failed"] += done - results.count(SENT)
+        if user_ids:
+            b["last_id"] = user_ids[-1]
+        await codeflixbots.update_broadcast(
+            self.id, last_id=b["last_id"], done=b["done"], success=b["success"], failed=b["failed"], removed=b["removed"]
+        )
+
+    async def run(self):
+        b = self.broadcast
+        start_time = time.time()
+        await codeflixbots.update_broadcast(self.id, status="running")
+        batch = []
+        try:
+            async for user in codeflixbots.get_user_ids(after=b.get("last_id"), batch_size=Config.BROADCAST_BATCH):
+                batch.append(user["_id"])
+                if len(batch) >= Config.BROADCAST_BATCH:
+                    await self._send_batch(batch)
+                    batch = []
+                    await self._report("Broadcast In Progress")
+                if self.cancelled:
+                    break
+            if batch and not self.cancelled:
+                await self._send_batch(batch)
+        except asyncio.CancelledError:
+            await codeflixbots.update_broadcast(self.id, status="interrupted")
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {self.id} stopped: {e}")
+            await codeflixbots.update_broadcast(self.id, status="interrupted")
+            await self._report(f"Broadcast Stopped ({e})")
+            return
+
+        status = "cancelled" if self.cancelled else "done"
+        await codeflixbots.update_broadcast(self.id, status=status, finished_at=datetime.datetime.utcnow())
+        completed_in = datetime.timedelta(seconds=int(time.time() - start_time))
+        await self._report(f"Bʀᴏᴀᴅᴄᴀꜱᴛ {'Cᴀɴᴄᴇʟʟᴇᴅ' if self.cancelled else 'Cᴏᴍᴩʟᴇᴛᴇᴅ'} Iɴ `{completed_in}`")
+
+    async def _report(self, title):
+        if not self.status_message:
+            return
+        b = self.broadcast
+        try:
+            await self.status_message.edit(
+                f"{title}: \n\nBroadcast ID : `{self.id}`\nTotal Users {b['total']}\nCompleted : {b['done']} / {b['total']}"
+                f"\nSuccess : {b['success']}\nFailed : {b['failed']}\nRemoved : {b['removed']}"
+            )
+        except Exception:
+            pass
+
+
+# broadcast id -> (runner, task) for broadcasts running in this process
+active_broadcasts = {}
+
+
+async def start_broadcast(client, from_chat_id, message_id, status_message=None):
+    broadcast = {
+        "from_chat_id": from_chat_id,
+        "message_id": message_id,
+        "status": "running",
+        "last_id": None,
+        "total": await codeflixbots.total_users_count(),
+        "done": 0, "success": 0, "failed": 0, "removed": 0,
+        "started_at": datetime.datetime.utcnow(),
+    }
+    broadcast["_id"] = await codeflixbots.add_broadcast(broadcast)
+    if broadcast["_id"] is None:
+        raise RuntimeError("Could not save the broadcast")
+    return _launch(client, broadcast, status_message)
+
+
+async def resume_broadcast(client, broadcast_id=None, status_message=None):
+    broadcast = await codeflixbots.get_broadcast(broadcast_id)
+    if not broadcast or broadcast["status"] == "done" or broadcast["_id"] in active_broadcasts:
+        return None
+    return _launch(client, broadcast, status_message)
+
+
+def cancel_broadcast(broadcast_id=None):
+    """Stop a running broadcast after the sends already in flight. Returns its id, or None."""
+    if broadcast_id is None and active_broadcasts:
+        broadcast_id = next(reversed(active_broadcasts))
+    entry = active_broadcasts.get(broadcast_id)
+    if not entry:
+        return None
+    entry[0].cancelled = True
+    return broadcast_id
+
+
+def _launch(client, broadcast, status_message):
+    runner = BroadcastRunner(client, broadcast, status_message)
+    task = asyncio.create_task(runner.run())
+    active_broadcasts[runner.id] = (runner, task)
+    task.add_done_callback(lambda _: active_broadcasts.pop(runner.id, None))
+    return runner
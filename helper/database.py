@@ -1,20 +1,163 @@
-import motor.motor_asyncio, datetime, pytz
+import motor.motor_asyncio, datetime, pytz, asyncio, time
+from pymongo import UpdateOne
 from config import Config
 import logging
 from .utils import send_log
+from .cache import TTLCache
+from .leaderboard import TopRenamers
+
+# Every field the rename path reads, with the default each getter falls back to.
+PROFILE_FIELDS = {
+    "format_template": None,
+    "caption": None,
+    "file_id": None,
+    "media_type": None,
+    "metadata": "Off",
+    "title": "Encoded by @Animes_Cruise",
+    "author": "@Animes_Cruise",
+    "artist": "@Animes_Cruise",
+    "audio": "By @Animes_Cruise",
+    "subtitle": "By @Animes_Cruise",
+    "video": "Encoded By @Otaku_Hindi_Hub",
+}
+
+
+class CounterBuffer:
+    """Write-behind ``$inc`` counters.
+
+    Increments are summed in memory per document and written every
+    ``interval`` seconds, or as soon as ``max_keys`` documents are pending,
+    as one unordered ``bulk_write``. A failed flush puts its increments back
+    so the next one retries them. ``on_flush`` gets the ids just written.
+    """
+
+    def __init__(self, collection, interval=5, max_keys=500, on_flush=None):
+        self.collection = collection
+        self.interval = interval
+        self.max_keys = max_keys
+        self.on_flush = on_flush
+        self.pending = {}  # _id -> {field: increment}
+        self.flushes = 0
+        self.failures = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+
+    def add(self, _id, field, amount=1):
+        counters = self.pending.setdefault(_id, {})
+        counters[field] = counters.get(field, 0) + amount
+        if len(self.pending) >= self.max_keys:
+            self._wakeup.set()
+
+    def pending_for(self, _id, field):
+        return self.pending.get(_id, {}).get(field, 0)
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Not cancel(): a flush in progress must finish, or its swapped-out batch is lost.
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+            started = time.monotonic()
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"_id": _id}, {"$inc": counters}) for _id, counters in batch.items()],
+                    ordered=False,
+                )
+            except BaseException as e:
+                # Put the batch back, on cancellation too, so the next flush retries it.
+                self.failures += 1
+                for _id, counters in batch.items():
+                    for field, amount in counters.items():
+                        self.add(_id, field, amount)
+                if not isinstance(e, Exception):
+                    raise
+                logging.error(f"Error flushing {len(batch)} counters: {e}")
+                return 0
+            finally:
+                self.last_latency = time.monotonic() - started
+                self.max_latency = max(self.max_latency, self.last_latency)
+                self._total_latency += self.last_latency
+            self.flushes += 1
+        if self.on_flush:
+            try:
+                await self.on_flush(list(batch))
+            except Exception as e:
+                logging.error(f"Error after flushing counters: {e}")
+        return len(batch)
+
+    def stats(self):
+        attempts = self.flushes + self.failures
+        return {
+            "pending_docs": len(self.pending),
+            "pending_increments": sum(sum(c.values()) for c in self.pending.values()),
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "avg_latency": self._total_latency / attempts if attempts else 0.0,
+        }
 
 
 class Database:
     def __init__(self, uri, database_name):
+        # Connecting is lazy; ping() at startup checks the server is really there.
+        self._client = motor.motor_asyncio.AsyncIOMotorClient(uri)
+        self.codeflixbots = self._client[database_name]
+        self.col = self.codeflixbots.user
+        self.jobs = self.codeflixbots.jobs
+        self.results = self.codeflixbots.results
+        self.broadcasts = self.codeflixbots.broadcasts
+        self.profiles = TTLCache(maxsize=Config.PROFILE_CACHE_SIZE, ttl=Config.PROFILE_CACHE_TTL)
+        # Ids of users known to have a document, so repeat /start never reaches Mongo.
+        self.known_users = set()
+        self.top_renamers = TopRenamers(Config.LEADERBOARD_SIZE)
+        self.counters = CounterBuffer(
+            self.col, Config.COUNTER_FLUSH_INTERVAL, Config.COUNTER_FLUSH_SIZE, on_flush=self._refresh_top_renamers
+        )
+
+    async def ping(self):
         try:
-            self._client = motor.motor_asyncio.AsyncIOMotorClient(uri)
-            self._client.server_info()
+            await self._client.admin.command("ping")
             logging.info("Successfully connected to MongoDB")
         except Exception as e:
             logging.error(f"Failed to connect to MongoDB: {e}")
             raise e
-        self.codeflixbots = self._client[database_name]
-        self.col = self.codeflixbots.user
+
+    async def ensure_indexes(self):
+        try:
+            # MongoDB's TTL monitor drops cached results once they are this old.
+            await self.results.create_index("created_at", expireAfterSeconds=Config.RESULT_CACHE_TTL)
+            # The leaderboard sorts on it; without the index that is a collection scan.
+            await self.col.create_index([("rename_count", -1)])
+        except Exception as e:
+            logging.error(f"Error creating indexes: {e}")
 
     def new_user(self, id, name=None, mention=None):
         return dict(
@@ -36,19 +179,33 @@ class Database:
             )
         )
 
+    async def warm_known_users(self):
+        """Load every user id into ``known_users``; returns how many were loaded."""
+        try:
+            async for user in self.get_user_ids(batch_size=5000):
+                self.known_users.add(user["_id"])
+        except Exception as e:
+            logging.error(f"Error loading known users: {e}")
+        return len(self.known_users)
+
     async def add_user(self, b, m):
         u = m.from_user
-        if not await self.is_user_exist(u.id):
-            name = u.first_name
-            if u.last_name:
-                name += f" {u.last_name}"
-            mention = u.mention or f"[User](tg://user?id={u.id})"
-            user = self.new_user(u.id, name, mention)
-            try:
-                await self.col.insert_one(user)
+        if u.id in self.known_users:
+            return
+        name = u.first_name
+        if u.last_name:
+            name += f" {u.last_name}"
+        mention = u.mention or f"[User](tg://user?id={u.id})"
+        try:
+            # One round trip, and two /start taps can't both insert.
+            result = await self.col.update_one(
+                {"_id": int(u.id)}, {"$setOnInsert": self.new_user(u.id, name, mention)}, upsert=True
+            )
+            self.known_users.add(int(u.id))
+            if result.upserted_id is not None:
                 await send_log(b, u)
-            except Exception as e:
-                logging.error(f"Error adding user {u.id}: {e}")
+        except Exception as e:
+            logging.error(f"Error adding user {u.id}: {e}")
 
     async def is_user_exist(self, id):
         try:
@@ -58,6 +215,50 @@ class Database:
             logging.error(f"Error checking if user {id} exists: {e}")
             return False
 
+    async def get_user_profile(self, id):
+        """Return every rename-relevant setting of a user from one projected, cached query."""
+        id = int(id)
+        profile = self.profiles.get(id)
+        if profile is None:
+            try:
+                user = await self.col.find_one({"_id": id}, {field: 1 for field in PROFILE_FIELDS})
+            except Exception as e:
+                logging.error(f"Error getting profile for user {id}: {e}")
+                return dict(PROFILE_FIELDS)
+            profile = {field: (user or {}).get(field, default) for field, default in PROFILE_FIELDS.items()}
+            self.profiles.set(id, profile)
+        return dict(profile)
+
+    async def get_settings(self, id, fields=None):
+        """Several settings of a user at once, e.g. ``get_settings(id, ["title", "author"])``.
+
+        Profile fields come from the cached profile; anything else is read with
+        one projected query. ``fields=None`` returns the whole profile.
+        """
+        profile = await self.get_user_profile(id)
+        if fields is None:
+            return profile
+        extra = [field for field in fields if field not in profile]
+        if extra:
+            try:
+                user = await self.col.find_one({"_id": int(id)}, {field: 1 for field in extra}) or {}
+            except Exception as e:
+                logging.error(f"Error getting settings {extra} for user {id}: {e}")
+                user = {}
+            profile.update({field: user.get(field) for field in extra})
+        return {field: profile[field] for field in fields}
+
+    async def update_settings(self, id, **fields):
+        """Set several settings of a user in one ``$set``."""
+        result = await self.col.update_one({"_id": int(id)}, {"$set": fields})
+        if result.matched_count:
+            self.profiles.update(int(id), **{k: v for k, v in fields.items() if k in PROFILE_FIELDS})
+        else:
+            self.profiles.pop(int(id))
+
+    async def _set_field(self, id, field, value):
+        await self.update_settings(id, **{field: value})
+
     async def total_users_count(self):
         try:
             return await self.col.count_documents({})
@@ -72,149 +273,264 @@ class Database:
             logging.error(f"Error getting all users: {e}")
             return None
 
+    def get_user_ids(self, after=None, batch_size=500):
+        """Cursor over user ids only, in ascending order, starting after ``after``."""
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        return self.col.find(query, {"_id": 1}).sort("_id", 1).batch_size(batch_size)
+
+    async def delete_users(self, user_ids):
+        try:
+            result = await self.col.delete_many({"_id": {"$in": list(user_ids)}})
+            for user_id in user_ids:
+                self.profiles.pop(user_id)
+                self.known_users.discard(user_id)
+            self.top_renamers.discard(user_ids)
+            return result.deleted_count
+        except Exception as e:
+            logging.error(f"Error deleting {len(user_ids)} users: {e}")
+            return 0
+
     async def delete_user(self, user_id):
         try:
             await self.col.delete_many({"_id": int(user_id)})
+            self.profiles.pop(int(user_id))
+            self.known_users.discard(int(user_id))
+            self.top_renamers.discard([int(user_id)])
         except Exception as e:
             logging.error(f"Error deleting user {user_id}: {e}")
 
     async def set_thumbnail(self, id, file_id):
         try:
-            await self.col.update_one({"_id": int(id)}, {"$set": {"file_id": file_id}})
+            await self._set_field(id, "file_id", file_id)
         except Exception as e:
             logging.error(f"Error setting thumbnail for user {id}: {e}")
 
     async def get_thumbnail(self, id):
         try:
-            user = await self.col.find_one({"_id": int(id)})
-            return user.get("file_id", None) if user else None
+            return (await self.get_user_profile(id))["file_id"]
         except Exception as e:
             logging.error(f"Error getting thumbnail for user {id}: {e}")
             return None
 
     async def set_caption(self, id, caption):
         try:
-            await self.col.update_one({"_id": int(id)}, {"$set": {"caption": caption}})
+            await self._set_field(id, "caption", caption)
         except Exception as e:
             logging.error(f"Error setting caption for user {id}: {e}")
 
     async def get_caption(self, id):
         try:
-            user = await self.col.find_one({"_id": int(id)})
-            return user.get("caption", None) if user else None
+            return (await self.get_user_profile(id))["caption"]
         except Exception as e:
             logging.error(f"Error getting caption for user {id}: {e}")
             return None
 
     async def set_format_template(self, id, format_template):
         try:
-            await self.col.update_one({"_id": int(id)}, {"$set": {"format_template": format_template}})
+            await self._set_field(id, "format_template", format_template)
         except Exception as e:
             logging.error(f"Error setting format template for user {id}: {e}")
 
     async def get_format_template(self, id):
         try:
-            user = await self.col.find_one({"_id": int(id)})
-            return user.get("format_template", None) if user else None
+            return (await self.get_user_profile(id))["format_template"]
         except Exception as e:
             logging.error(f"Error getting format template for user {id}: {e}")
             return None
 
     async def set_media_preference(self, id, media_type):
         try:
-            await self.col.update_one({"_id": int(id)}, {"$set": {"media_type": media_type}})
+            await self._set_field(id, "media_type", media_type)
         except Exception as e:
             logging.error(f"Error setting media preference for user {id}: {e}")
 
     async def get_media_preference(self, id):
         try:
-            user = await self.col.find_one({"_id": int(id)})
-            return user.get("media_type", None) if user else None
+            return (await self.get_user_profile(id))["media_type"]
         except Exception as e:
             logging.error(f"Error getting media preference for user {id}: {e}")
             return None
 
     async def get_metadata(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('metadata', "Off")
+        return (await self.get_user_profile(user_id))['metadata']
 
     async def set_metadata(self, user_id, metadata):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'metadata': metadata}})
+        await self._set_field(user_id, 'metadata', metadata)
 
     async def get_title(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('title', 'Encoded by @Animes_Cruise')
+        return (await self.get_user_profile(user_id))['title']
 
     async def set_title(self, user_id, title):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'title': title}})
+        await self._set_field(user_id, 'title', title)
 
     async def get_author(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('author', '@Animes_Cruise')
+        return (await self.get_user_profile(user_id))['author']
 
     async def set_author(self, user_id, author):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'author': author}})
+        await self._set_field(user_id, 'author', author)
 
     async def get_artist(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('artist', '@Animes_Cruise')
+        return (await self.get_user_profile(user_id))['artist']
 
     async def set_artist(self, user_id, artist):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'artist': artist}})
+        await self._set_field(user_id, 'artist', artist)
 
     async def get_audio(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('audio', 'By @Animes_Cruise')
+        return (await self.get_user_profile(user_id))['audio']
 
     async def set_audio(self, user_id, audio):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'audio': audio}})
+        await self._set_field(user_id, 'audio', audio)
 
     async def get_subtitle(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('subtitle', "By @Animes_Cruise")
+        return (await self.get_user_profile(user_id))['subtitle']
 
     async def set_subtitle(self, user_id, subtitle):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'subtitle': subtitle}})
+        await self._set_field(user_id, 'subtitle', subtitle)
 
     async def get_video(self, user_id):
-        user = await self.col.find_one({'_id': int(user_id)})
-        return user.get('video', 'Encoded By @Otaku_Hindi_Hub')
+        return (await self.get_user_profile(user_id))['video']
 
     async def set_video(self, user_id, video):
-        await self.col.update_one({'_id': int(user_id)}, {'$set': {'video': video}})
+        await self._set_field(user_id, 'video', video)
 
     # ✅ Leaderboard Functions
     async def increment_rename_count(self, user_id):
-        try:
-            await self.col.update_one(
-                {"_id": int(user_id)},
-                {"$inc": {"rename_count": 1}}
-            )
-        except Exception as e:
-            logging.error(f"Error incrementing rename count for user {user_id}: {e}")
+        # Buffered: the count reaches Mongo with the next flush, not on the job's path.
+        self.counters.add(int(user_id), "rename_count")
+        self.top_renamers.bump(int(user_id))
+
+    async def _refresh_top_renamers(self, user_ids):
+        """Offer the leaderboard the counts of users whose increments were just written."""
+        cursor = self.col.find({"_id": {"$in": user_ids}}, {"name": 1, "rename_count": 1})
+        async for user in cursor:
+            self.top_renamers.offer(user)
 
     async def get_rename_count(self, user_id):
         try:
-            user = await self.col.find_one({"_id": int(user_id)})
-            return user.get("rename_count", 0) if user else 0
+            user = await self.col.find_one({"_id": int(user_id)}, {"rename_count": 1})
+            count = user.get("rename_count", 0) if user else 0
+            return count + self.counters.pending_for(int(user_id), "rename_count")
         except Exception as e:
             logging.error(f"Error getting rename count for user {user_id}: {e}")
             return 0
 
     async def get_top_renamers(self, limit=10):
+        """Served from ``top_renamers``; the database is only asked to (re)load it."""
+        if self.top_renamers.loaded and limit <= self.top_renamers.size:
+            return self.top_renamers.top(limit)
         try:
-            cursor = self.col.find({"rename_count": {"$gt": 0}}).sort("rename_count", -1).limit(limit)
-            return await cursor.to_list(length=limit)
+            size = max(limit, self.top_renamers.size)
+            cursor = self.col.find(
+                {"rename_count": {"$gt": 0}}, {"name": 1, "rename_count": 1}
+            ).sort("rename_count", -1).limit(size)
+            users = await cursor.to_list(length=size)
         except Exception as e:
             logging.error(f"Error getting top users: {e}")
             return []
+        if limit <= self.top_renamers.size:
+            self.top_renamers.load(users)
+            return self.top_renamers.top(limit)
+        return users[:limit]
 
     async def reset_leaderboard(self):
         try:
-            await self.col.update_many({}, {"$set": {"rename_count": 0}})
+            # Write buffered increments first so none land on top of the reset.
+            await self.counters.flush()
+            await self.col.update_many({"rename_count": {"$gt": 0}}, {"$set": {"rename_count": 0}})
+            self.top_renamers.clear()
             logging.info("Leaderboard cleared successfully.")
+            return True
         except Exception as e:
             logging.error(f"Error clearing leaderboard: {e}")
+            return False
+
+    # ✅ Job Journal
+    async def add_job(self, job):
+        try:
+            job.setdefault("created_at", datetime.datetime.utcnow())
+            await self.jobs.replace_one({"_id": job["_id"]}, job, upsert=True)
+        except Exception as e:
+            logging.error(f"Error journaling job {job.get('_id')}: {e}")
+
+    async def update_job(self, job_id, **fields):
+        try:
+            fields["updated_at"] = datetime.datetime.utcnow()
+            await self.jobs.update_one({"_id": job_id}, {"$set": fields})
+        except Exception as e:
+            logging.error(f"Error updating job {job_id}: {e}")
+
+    async def remove_job(self, job_id):
+        try:
+            await self.jobs.delete_one({"_id": job_id})
+        except Exception as e:
+            logging.error(f"Error removing job {job_id}: {e}")
+
+    async def get_jobs(self, strict=False):
+        """Journaled jobs, oldest first. ``strict`` raises instead of returning [] on errors."""
+        try:
+            return await self.jobs.find({}).sort("created_at", 1).to_list(length=None)
+        except Exception as e:
+            logging.error(f"Error getting journaled jobs: {e}")
+            if strict:
+                raise
+            return []
+
+    # ✅ Result Cache
+    async def get_result(self, key):
+        try:
+            return await self.results.find_one({"_id": key})
+        except Exception as e:
+            logging.error(f"Error getting cached result {key}: {e}")
+            return None
+
+    async def add_result(self, key, file_id, media_type):
+        try:
+            await self.results.replace_one(
+                {"_id": key},
+                {"_id": key, "file_id": file_id, "media_type": media_type, "created_at": datetime.datetime.utcnow()},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error caching result {key}: {e}")
+
+    async def remove_result(self, key):
+        try:
+            await self.results.delete_one({"_id": key})
+        except Exception as e:
+            logging.error(f"Error removing cached result {key}: {e}")
+
+    async def purge_results(self):
+        try:
+            result = await self.results.delete_many({})
+            return result.deleted_count
+        except Exception as e:
+            logging.error(f"Error purging result cache: {e}")
+            return 0
+
+    # ✅ Broadcasts
+    async def add_broadcast(self, broadcast):
+        try:
+            result = await self.broadcasts.insert_one(broadcast)
+            return result.inserted_id
+        except Exception as e:
+            logging.error(f"Error saving broadcast: {e}")
+            return None
+
+    async def update_broadcast(self, broadcast_id, **fields):
+        try:
+            await self.broadcasts.update_one({"_id": broadcast_id}, {"$set": fields})
+        except Exception as e:
+            logging.error(f"Error updating broadcast {broadcast_id}: {e}")
+
+    async def get_broadcast(self, broadcast_id=None):
+        """A broadcast by id, or the latest one that didn't finish."""
+        try:
+            if broadcast_id is not None:
+                return await self.broadcasts.find_one({"_id": broadcast_id})
+            return await self.broadcasts.find_one({"status": {"$ne": "done"}}, sort=[("started_at", -1)])
+        except Exception as e:
+            logging.error(f"Error getting broadcast {broadcast_id}: {e}")
+            return None
 
 
 # Instantiate
@@ -0,0 +1,62 @@
+import os
+import shutil
+import asyncio
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WORK_DIRS = ("downloads", "metadata")
+
+
+def _dir_size(path):
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    except FileNotFoundError:
+        return 0
+
+
+class DiskBudget:
+    """Admission control for job artifacts: space is reserved up front and
+    jobs that don't fit wait until running ones release theirs."""
+
+    def __init__(self, path=".", headroom=0, work_dirs=WORK_DIRS):
+        self.path = path
+        self.headroom = headroom
+        self.work_dirs = work_dirs
+        self.reserved = 0
+        self._released = asyncio.Event()
+
+    def available(self):
+        # Files already written by running jobs are covered by their reservation,
+        # so add them back instead of counting them twice.
+        written = sum(_dir_size(os.path.join(self.path, d)) for d in self.work_dirs)
+        free = shutil.disk_usage(self.path).free
+        return free + written - self.reserved - self.headroom
+
+    def fits(self, nbytes):
+        return nbytes <= self.available()
+
+    async def reserve(self, nbytes, poll_interval=5):
+        """Wait until ``nbytes`` fit on disk, then reserve them. Returns the reserved amount."""
+        while not self.fits(nbytes):
+            if not self.reserved:
+                raise RuntimeError(
+                    f"Not enough disk space: need {nbytes} bytes, {max(self.available(), 0)} available"
+                )
+            self._released.clear()
+            try:
+                await asyncio.wait_for(self._released.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        self.reserved += nbytes
+        return nbytes
+
+    def release(self, nbytes):
+        if nbytes:
+            self.reserved = max(self.reserved - nbytes, 0)
+            self._released.set()
+
+
+# Instantiate
+disk_budget = DiskBudget(headroom=Config.DISK_HEADROOM_MB * 1024 * 1024)
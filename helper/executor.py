@@ -0,0 +1,71 @@
+import os
+import time
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Blocking filesystem and image work runs here so the event loop keeps serving updates.
+blocking_executor = ThreadPoolExecutor(max_workers=Config.BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the blocking-work pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+async def remove_file(path):
+    await run_blocking(_remove, path)
+
+
+async def makedirs(path):
+    await run_blocking(os.makedirs, path, exist_ok=True)
+
+
+class LoopLagMonitor:
+    """Wakes up every ``interval`` seconds and logs when it woke up more than
+    ``threshold_ms`` late, i.e. when something held the event loop that long."""
+
+    def __init__(self, interval=0.5, threshold_ms=100):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self, debug=False):
+        if debug:
+            # asyncio's debug mode names the slow callback itself, at some overhead.
+            loop = asyncio.get_running_loop()
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+
+# Instantiate
+loop_monitor = LoopLagMonitor(threshold_ms=Config.LOOP_LAG_THRESHOLD_MS)
@@ -0,0 +1,111 @@
+import os
+import shutil
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Containers ffmpeg can demux front to back from a pipe. MP4/MOV/M4A keep their
+# index (moov) wherever the muxer put it, often at the end, so they need a
+# seekable input and go through the download-then-remux path instead.
+STREAMABLE_EXTENSIONS = {
+    ".mkv", ".mka", ".webm", ".ts", ".m2ts", ".mts", ".flv",
+    ".mp3", ".aac", ".ac3", ".flac", ".ogg", ".opus", ".wav",
+}
+STREAMABLE_MIME_TYPES = {
+    "video/x-matroska", "video/webm", "video/mp2t", "video/x-flv",
+    "audio/x-matroska", "audio/mpeg", "audio/aac", "audio/flac", "audio/ogg", "audio/opus", "audio/wav",
+}
+
+
+def is_streamable(file_name, mime_type=None):
+    if mime_type and mime_type.lower() in STREAMABLE_MIME_TYPES:
+        return True
+    return os.path.splitext(file_name or "")[1].lower() in STREAMABLE_EXTENSIONS
+
+
+def _ffmpeg_path():
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("FFmpeg not found in PATH")
+    return ffmpeg
+
+
+def metadata_cmd(ffmpeg, input_path, output_path, profile):
+    metadata = {
+        'title': profile['title'] or "",
+        'artist': profile['artist'] or "",
+        'author': profile['author'] or "",
+        'video_title': profile['video'] or "",
+        'audio_title': profile['audio'] or "",
+        'subtitle': profile['subtitle'] or ""
+    }
+
+    return [
+        ffmpeg, "-i", input_path,
+        "-map", "0", "-c", "copy",
+        "-map_metadata", "0",          # ✅ ensures global metadata copy
+        "-metadata", f"title={metadata['title']}",
+        "-metadata", f"artist={metadata['artist']}",
+        "-metadata", f"author={metadata['author']}",
+        "-metadata:s:v", f"title={metadata['video_title']}",
+        "-metadata:s:a", f"title={metadata['audio_title']}",
+        "-metadata:s:s", f"title={metadata['subtitle']}",
+        "-fflags", "+genpts",
+        "-reset_timestamps", "1",
+        "-avoid_negative_ts", "make_zero",
+        "-f", "matroska",             # ✅ force MKV
+        "-loglevel", "error", "-y", output_path
+    ]
+
+
+async def add_metadata(input_path, output_path, profile):
+    """Remux a downloaded file into ``output_path`` with the user's metadata."""
+    cmd = metadata_cmd(_ffmpeg_path(), input_path, output_path, profile)
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+
+    if process.returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"FFmpeg error: {stderr.decode()}")
+
+
+async def stream_metadata(client, message, output_path, profile, total=0, progress=None, progress_args=()):
+    """Remux ``message``'s media into ``output_path`` while it downloads.
+
+    Chunks from ``client.stream_media`` are piped into ffmpeg's stdin, so the
+    remux overlaps the download and ``output_path`` is the only file written.
+    """
+    cmd = metadata_cmd(_ffmpeg_path(), "pipe:0", output_path, profile)
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    # Drain stderr alongside the feed so a chatty ffmpeg can't block on a full pipe.
+    stderr_task = asyncio.create_task(process.stderr.read())
+    current = 0
+
+    try:
+        async for chunk in client.stream_media(message):
+            process.stdin.write(chunk)
+            await process.stdin.drain()
+            current += len(chunk)
+            if progress:
+                await progress(current, total or current, *progress_args)
+        process.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg gave up on the input; its exit code and stderr say why.
+        pass
+    except BaseException:
+        process.kill()
+        await process.wait()
+        stderr_task.cancel()
+        raise
+
+    await process.wait()
+    stderr = await stderr_task
+
+    if process.returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"FFmpeg error: {stderr.decode()}")
+    return current
@@ -0,0 +1,139 @@
+import re
+import unicodedata
+from functools import lru_cache
+from config import Config
+
+# Every rule is (kind, priority, pattern, value). All rules are folded into one
+# alternation and the lowercased filename is scanned once; for each kind the
+# match with the lowest priority wins, ties going to the leftmost one.
+#
+# Patterns start with a single leading token - a literal, \d, \s or a plain
+# character class - and never with a group, \b or a lookaround. Rules are
+# bucketed under each character that leading token accepts, which lets the regex
+# engine skip every position no rule can start at and reject the rest on their
+# first character. Word boundaries are written as a lookbehind after the leading
+# token instead. Season/episode numbers are read from the matched text; quality
+# is either the matched text or the fixed ``value``.
+RULES = [
+    # season + episode pairs
+    ("pair", 10, r"s-?\d+[\s\-._\[\]]*(?:episode|ep|e)[\s\-.]*\d+", None),
+    ("pair", 11, r"s(?<![a-z0-9]s)eason[\s\-.]*\d+[\s\-._,\[\]]*episode[\s\-.]*\d+", None),
+    ("pair", 12, r"\d(?<![a-z0-9]\d)\d?x\d{1,3}(?![a-z0-9])", None),
+    ("pair", 13, r"s(?<![a-z0-9]s)\d{1,2}[\s\-_.]+\d{1,4}\b", None),
+    # episode only
+    ("episode", 20, r"e(?<![a-z0-9]e)(?:pisode|p)?[\s\-.]*\d+", None),
+    ("episode", 21, r"\s-\s(?!(?:19|20)\d\d\b)\d{1,4}(?:v\d)?\b", None),
+    ("episode", 22, r"\d(?<![a-z0-9]\d)(?!(?<=1)9\d\d\b)(?!(?<=2)0\d\d\b)\d{0,3}\b", None),
+    # season only
+    ("season", 30, r"s(?<![a-z0-9]s)eason[\s\-.]*\d+", None),
+    ("season", 31, r"s(?<![a-z0-9]s)-?\d{1,2}\b", None),
+    # quality, in the order the old pattern list tried them
+    ("quality", 40, r"\d(?<![a-z0-9]\d)\d{2,3}[pi]\b", None),
+    ("quality", 41, r"4(?<![a-z0-9]4)k\b", "4k"),
+    ("quality", 42, r"2(?<![a-z0-9]2)k\b", "2k"),
+    ("quality", 43, r"s(?<![a-z0-9]s)d\b", "480p"),
+    ("quality", 44, r"h(?<![a-z0-9]h)d\b", "720p"),
+    ("quality", 45, r"[u4](?<![a-z0-9][u4])(?:hd|kx264|kx265)\b", "4k"),
+    ("quality", 46, r"h(?<![a-z0-9]h)d(?:rip|tv)\b", "720p"),
+    ("quality", 47, r"[xh](?<![a-z0-9][xh])(?:264|265|evc)\b", "1080p"),
+    ("quality", 48, r"\d\d{2,3}[pi]", None),
+]
+
+_NUMBER = re.compile(r"\d+")
+
+_scanner = None
+_rules = []
+_best_priority = {}
+
+
+def _leading_chars(pattern):
+    """Split ``pattern`` into the characters its leading token accepts and the rest."""
+    if pattern.startswith("\\d"):
+        return "0123456789", pattern[2:]
+    if pattern.startswith("\\s"):
+        return " \t\n\r\f\v", pattern[2:]
+    if pattern.startswith("["):
+        end = pattern.index("]")
+        return pattern[1:end], pattern[end + 1:]
+    return pattern[0], pattern[1:]
+
+
+def compile_rules(rules=RULES):
+    """Build the combined scanner from ``rules``. Call again to swap the rule set."""
+    global _scanner, _rules, _best_priority
+    buckets, best_priority = {}, {}
+    for kind, priority, pattern, value in sorted(rules, key=lambda rule: rule[1]):
+        chars, rest = _leading_chars(pattern)
+        for char in chars:
+            buckets.setdefault(char, []).append((rest, (kind, priority, value)))
+        best_priority.setdefault(kind, priority)
+    # An empty marker group closes every branch; match.lastindex then says which rule matched.
+    branches, compiled = [], [None]
+    for char, entries in buckets.items():
+        branches.append(f"{re.escape(char)}(?:{'|'.join(f'{rest}()' for rest, _ in entries)})")
+        compiled.extend(rule for _, rule in entries)
+    _scanner = re.compile("|".join(branches), re.ASCII)
+    _rules = compiled
+    _best_priority = best_priority
+    _parse_cached.cache_clear()
+
+
+def normalize_filename(filename):
+    """Cache key for a release name: NFKC-folded, lowercased, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", filename).lower().split())
+
+
+def parse_filename(filename):
+    """Return ``(season, episode, quality)`` for a release name, memoized on its normalized form."""
+    return _parse_cached(normalize_filename(filename))
+
+
+def episode_order(filename):
+    """Sort key putting release names in (season, episode) order; unnumbered ones go last."""
+    season, episode, _ = parse_filename(filename)
+    return (
+        int(season) if season else 0,
+        int(episode) if episode else float("inf"),
+        normalize_filename(filename),
+    )
+
+
+def parse_cache_info():
+    return _parse_cached.cache_info()
+
+
+def scan_filename(filename):
+    """Return ``(season, episode, quality)`` for a release name in a single, uncached scan."""
+    rules, best_priority = _rules, _best_priority
+    best = {}
+    for match in _scanner.finditer(filename.lower()):
+        kind, priority, value = rules[match.lastindex]
+        current = best.get(kind)
+        if current is None or priority < current[0]:
+            best[kind] = (priority, value, match)
+            # Nothing later in the name can beat the strongest pair and quality rules.
+            if priority == best_priority[kind] and len(best) > 1:
+                pair, quality = best.get("pair"), best.get("quality")
+                if pair and quality and pair[0] == best_priority["pair"] and quality[0] == best_priority["quality"]:
+                    break
+
+    season = episode = None
+    if "pair" in best:
+        season, episode = _NUMBER.findall(best["pair"][2].group())[:2]
+    else:
+        if "season" in best:
+            season = _NUMBER.search(best["season"][2].group()).group()
+        if "episode" in best:
+            episode = _NUMBER.search(best["episode"][2].group()).group()
+
+    quality = "Unknown"
+    if "quality" in best:
+        _, value, match = best["quality"]
+        quality = value or match.group()
+
+    return season, episode, quality
+
+
+_parse_cached = lru_cache(maxsize=Config.PARSE_CACHE_SIZE)(scan_filename)
+
+compile_rules()
@@ -0,0 +1,63 @@
+import re
+
+
+def _trie_pattern(node):
+    """Regex for a trie node; at any position it matches the longest keyword there."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    # A keyword ending here makes the rest optional; greedy ``?`` still prefers the longer one.
+    return f"(?:{body})?" if "" in node else body
+
+
+class KeywordMatcher:
+    """Finds which categories of keywords occur in a text in a single regex scan.
+
+    ``categories`` maps a category name to its keywords, checked in order;
+    ``exceptions`` are keywords whose presence anywhere clears the text. All
+    keywords are lowercased and deduplicated once, into a trie-shaped regex:
+    at every position it matches the longest keyword starting there, and every
+    shorter keyword starting at the same position is a prefix of that one, so
+    the categories of all overlapping matches are precomputed per keyword.
+    """
+
+    def __init__(self, categories, exceptions=()):
+        self.categories = list(categories)
+        rank = {}  # keyword -> index of the first category listing it, or -1 for exceptions
+        for index, (category, keywords) in enumerate(categories.items()):
+            for keyword in keywords:
+                rank.setdefault(keyword.lower(), index)
+        for keyword in exceptions:
+            rank[keyword.lower()] = -1
+        self.keywords = rank
+
+        trie = {}
+        for keyword in rank:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        # For each keyword, the best rank among it and the keywords it starts with.
+        self._best = {
+            keyword: min(rank[keyword[:end]] for end in range(1, len(keyword) + 1) if keyword[:end] in rank)
+            for keyword in rank
+        }
+        # Matching inside a lookahead consumes nothing, so finditer visits every
+        # position and overlapping keywords are all seen.
+        pattern = _trie_pattern(trie)
+        self._scanner = re.compile(f"(?=({pattern}))") if pattern else None
+
+    def match(self, text):
+        """Name of the first category with a keyword in ``text``, or None if none
+        matches or an exception keyword is present."""
+        if self._scanner is None:
+            return None
+        best = len(self.categories)
+        for found in self._scanner.finditer(text.lower()):
+            rank = self._best[found.group(1)]
+            if rank < 0:
+                return None
+            best = min(best, rank)
+        return self.categories[best] if best < len(self.categories) else None
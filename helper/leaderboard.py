@@ -0,0 +1,58 @@
+class TopRenamers:
+    """The ``size`` users with the most renames, kept in memory.
+
+    Rename counts only ever go up, so once loaded from the database the set
+    stays exact by offering it every user's new count as it changes: a user
+    outside the top can only get in by passing the current lowest entry.
+    Deleting a top user leaves a gap only the database can fill, so that
+    marks the board for a reload instead.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.loaded = False
+        self._entries = {}  # user id -> {"_id", "name", "rename_count"}
+
+    def offer(self, user):
+        """Record a user document's latest ``rename_count``."""
+        user_id, count = user["_id"], user.get("rename_count", 0)
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry["rename_count"] = max(entry["rename_count"], count)
+            return
+        if count <= 0:
+            return
+        if len(self._entries) >= self.size:
+            lowest = min(self._entries.values(), key=lambda e: e["rename_count"])
+            if count <= lowest["rename_count"]:
+                return
+            del self._entries[lowest["_id"]]
+        self._entries[user_id] = {"_id": user_id, "name": user.get("name", "User"), "rename_count": count}
+
+    def bump(self, user_id, amount=1):
+        """Count renames of a user already on the board before they reach the database."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry["rename_count"] += amount
+
+    def load(self, users):
+        """Merge a fresh top list from the database with anything offered meanwhile."""
+        for user in users:
+            entry = self._entries.get(user["_id"])
+            count = max(user.get("rename_count", 0), entry["rename_count"] if entry else 0)
+            self._entries[user["_id"]] = {"_id": user["_id"], "name": user.get("name", "User"), "rename_count": count}
+        self._entries = dict(sorted(self._entries.items(), key=lambda item: -item[1]["rename_count"])[:self.size])
+        self.loaded = True
+
+    def discard(self, user_ids):
+        for user_id in user_ids:
+            if self._entries.pop(user_id, None) is not None:
+                self.loaded = False
+
+    def clear(self):
+        self._entries.clear()
+        self.loaded = True
+
+    def top(self, limit=None):
+        users = sorted(self._entries.values(), key=lambda e: -e["rename_count"])
+        return [dict(user) for user in users[:limit]]
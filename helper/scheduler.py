@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class JobScheduler:
+    """Runs queued jobs under a global concurrency limit and a per-user cap,
+    handing free slots to users in round-robin order."""
+
+    def __init__(self, max_jobs, max_jobs_per_user):
+        self.max_jobs = max_jobs
+        self.max_jobs_per_user = max_jobs_per_user
+        self._queues = OrderedDict()  # user_id -> deque of pending jobs, in round-robin order
+        self._running = {}  # user_id -> number of running jobs
+        self._tasks = set()
+        self.draining = False
+
+    @property
+    def active(self):
+        return sum(self._running.values())
+
+    @property
+    def pending(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def queue_position(self, user_id):
+        """Position a job submitted now by ``user_id`` would wait at; 0 means it starts right away."""
+        queue = self._queues.get(user_id, ())
+        if not queue and self.active < self.max_jobs and self._running.get(user_id, 0) < self.max_jobs_per_user:
+            return 0
+        # Round-robin hands out one job per user per round: count what is dispatched before us.
+        rounds = len(queue)
+        ahead = rounds
+        before_us = True
+        for other, other_queue in self._queues.items():
+            if other == user_id:
+                before_us = False
+                continue
+            ahead += min(len(other_queue), rounds + (1 if before_us else 0))
+        return ahead + 1
+
+    def submit(self, user_id, job):
+        """Queue ``job``, a coroutine function taking no arguments, for ``user_id``."""
+        if self.draining:
+            raise RuntimeError("Scheduler is draining, not accepting new jobs")
+        self._queues.setdefault(user_id, deque()).append(job)
+        self._dispatch()
+
+    def _dispatch(self):
+        while not self.draining and self.active < self.max_jobs:
+            for user_id in self._queues:
+                if self._running.get(user_id, 0) < self.max_jobs_per_user:
+                    break
+            else:
+                return
+            # Re-inserting the user at the end of the ring gives everyone else the next turn.
+            queue = self._queues.pop(user_id)
+            job = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            task = asyncio.create_task(self._run(user_id, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def drain(self, timeout):
+        """Stop starting jobs and wait up to ``timeout`` seconds for the running ones.
+
+        Jobs still running at the deadline are cancelled; queued ones are simply
+        not started. Returns how many jobs were cancelled.
+        """
+        self.draining = True
+        tasks = set(self._tasks)
+        if not tasks:
+            return 0
+        logger.info(f"Draining {len(tasks)} running jobs ({self.pending} queued), waiting up to {timeout}s")
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+    async def _run(self, user_id, job):
+        try:
+            await job()
+        except Exception as e:
+            logger.exception(f"Job for user {user_id} failed: {e}")
+        finally:
+            self._running[user_id] -= 1
+            if not self._running[user_id]:
+                del self._running[user_id]
+            self._dispatch()
+
+
+# Instantiate
+rename_scheduler = JobScheduler(Config.MAX_CONCURRENT_JOBS, Config.MAX_JOBS_PER_USER)
@@ -0,0 +1,93 @@
+import os
+import mimetypes
+import logging
+from config import Config
+from helper.ffmpeg import is_streamable
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 512
+TS_PACKET = 188
+
+
+def sniff_container(head):
+    """Name the media container ``head`` (the first bytes of a file) starts with, or None."""
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "matroska"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head.startswith(b"RIFF") and head[8:12] in (b"AVI ", b"WAVE"):
+        return "avi" if head[8:12] == b"AVI " else "wav"
+    if head.startswith(b"ID3"):
+        return "mp3"
+    if head.startswith((b"OggS", b"fLaC", b"FLV")):
+        return {b"O": "ogg", b"f": "flac", b"F": "flv"}[head[:1]]
+    if head.startswith(b"\x30\x26\xb2\x75"):
+        return "asf"
+    if head[:1] == head[TS_PACKET:TS_PACKET + 1] == b"\x47":
+        return "mpegts"
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "mpeg-audio"
+    return None
+
+
+def sniff_file(path):
+    try:
+        with open(path, "rb") as f:
+            return sniff_container(f.read(SNIFF_BYTES))
+    except OSError as e:
+        logger.error(f"Could not sniff {path}: {e}")
+        return None
+
+
+def metadata_enabled(profile):
+    value = profile.get("metadata")
+    return value is True or str(value).lower() == "on"
+
+
+class StagePlan:
+    """Which stages a rename job runs.
+
+    ``remux`` is True or False when it can be decided up front, and None when
+    it depends on what the downloaded bytes turn out to be (see ``resolve``).
+    """
+
+    def __init__(self, remux, stream, extension):
+        self.remux = remux
+        self.stream = stream
+        self.extension = extension
+
+    @property
+    def disk_factor(self):
+        """How many copies of the file can be on disk at once."""
+        return 1 if self.stream or self.remux is False else 2
+
+    def resolve(self, path):
+        """Settle an undecided ``remux`` by sniffing the downloaded file."""
+        if self.remux is None:
+            container = sniff_file(path)
+            self.remux = container is not None
+            logger.info(f"Sniffed {path}: {container or 'not media'}, remux={self.remux}")
+        return self.remux
+
+    def __repr__(self):
+        return f"StagePlan(remux={self.remux}, stream={self.stream}, extension={self.extension!r})"
+
+
+def plan_stages(profile, media_type, file_name, mime_type=None):
+    original_ext = os.path.splitext(file_name or "")[1]
+    if not metadata_enabled(profile):
+        # Nothing to embed: upload the downloaded file as it is, under its own extension.
+        ext = original_ext or mimetypes.guess_extension(mime_type or "") or ".bin"
+        return StagePlan(remux=False, stream=False, extension=ext)
+
+    if media_type == "video":
+        remux, ext = True, ".mkv"
+    elif media_type == "audio":
+        remux, ext = True, ".mp3"
+    else:
+        # Documents may be anything from an MKV to a zip; let the bytes decide.
+        remux, ext = None, original_ext or ".bin"
+
+    stream = remux is True and Config.STREAM_REMUX and is_streamable(file_name, mime_type)
+    return StagePlan(remux=remux, stream=stream, extension=ext)
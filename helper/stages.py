@@ -0,0 +1,131 @@
+import time
+import asyncio
+import logging
+from config import Config
+from helper.upload_pool import upload_pool
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """One kind of work (network in, CPU, network out) with its own concurrency
+    limit and a bounded backlog of jobs waiting for a slot."""
+
+    def __init__(self, name, slots, backlog):
+        self.name = name
+        self.slots = slots
+        self.backlog = backlog
+        self._slots = asyncio.Semaphore(slots)
+        self._capacity = asyncio.Semaphore(slots + backlog)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.runs = 0
+        self.active = 0
+        self.waiting = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+        self.since = time.monotonic()
+
+    async def enter(self):
+        """Take a place in this stage's bounded queue; blocks while it is full."""
+        await self._capacity.acquire()
+
+    def leave(self):
+        self._capacity.release()
+
+    async def run(self, func, *args):
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.monotonic()
+        self.wait_time += started - queued_at
+        self.active += 1
+        try:
+            return await func(*args)
+        finally:
+            self.active -= 1
+            self.runs += 1
+            self.busy_time += time.monotonic() - started
+            self._slots.release()
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.since, 1e-9)
+        return {
+            "runs": self.runs,
+            "active": self.active,
+            "waiting": self.waiting,
+            "avg_run": self.busy_time / self.runs if self.runs else 0.0,
+            "avg_wait": self.wait_time / self.runs if self.runs else 0.0,
+            # Share of the stage's slot-time spent working since the stats were reset.
+            "utilization": self.busy_time / (elapsed * self.slots),
+        }
+
+
+class StagedExecutor:
+    """Runs jobs through a fixed sequence of stages so different jobs can occupy
+    different stages at the same time.
+
+    A job only gives up its place in one stage once it has a place in the next
+    one's queue, so a slow stage pushes back on the stages before it instead of
+    letting work pile up. Jobs sharing an ``order_key`` pass every stage in the
+    order they entered the first one, so one user's files come out in sequence.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+        self._locks = {}  # (order_key, stage name) -> [lock, number of holders and waiters]
+
+    async def run(self, order_key, steps):
+        """Run ``steps``, one ``func(*args)`` tuple per stage, for a job of ``order_key``."""
+        held_stage = held_lock = None
+        try:
+            for stage, (func, *args) in zip(self.stages, steps):
+                # Hand over hand: claim the next place before giving up the current one.
+                await self._acquire(order_key, stage)
+                if held_lock:
+                    self._release(order_key, held_lock)
+                held_lock = stage
+                await stage.enter()
+                if held_stage:
+                    held_stage.leave()
+                held_stage = stage
+                await stage.run(func, *args)
+        finally:
+            if held_stage:
+                held_stage.leave()
+            if held_lock:
+                self._release(order_key, held_lock)
+
+    async def _acquire(self, order_key, stage):
+        entry = self._locks.setdefault((order_key, stage.name), [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._forget(order_key, stage)
+            raise
+
+    def _release(self, order_key, stage):
+        self._locks[(order_key, stage.name)][0].release()
+        self._forget(order_key, stage)
+
+    def _forget(self, order_key, stage):
+        entry = self._locks[(order_key, stage.name)]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._locks[(order_key, stage.name)]
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+
+# Instantiate
+NET_IN = Stage("download", Config.STAGE_NET_IN, Config.STAGE_BACKLOG)
+CPU = Stage("remux", Config.STAGE_CPU, Config.STAGE_BACKLOG)
+# Every upload session gets its own share of upload slots, or extra sessions would sit idle.
+NET_OUT = Stage("upload", Config.STAGE_NET_OUT * (len(upload_pool.clients) + 1), Config.STAGE_BACKLOG)
+rename_stages = StagedExecutor((NET_IN, CPU, NET_OUT))
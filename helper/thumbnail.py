@@ -0,0 +1,132 @@
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from PIL import Image
+from config import Config
+from helper.executor import run_blocking, remove_file
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = (1280, 720)
+
+
+def render_thumbnail(src, dst):
+    """Convert ``src`` into the upload thumbnail format and write it to ``dst``."""
+    with Image.open(src) as img:
+        img = img.convert("RGB").resize(THUMB_SIZE)
+        img.save(dst, "JPEG")
+    return dst
+
+
+class ThumbnailCache:
+    """Processed thumbnails on disk, keyed by the Telegram ``file_id`` they were
+    rendered from and evicted least-recently-used once ``max_bytes`` is exceeded."""
+
+    def __init__(self, path="thumbs", max_bytes=50 * 1024 * 1024):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._pending = {}  # file_id -> future of a render in progress
+        self._pins = {}  # file name -> uploads using it, never evicted while listed
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Rebuild the LRU order from the files a previous run left behind.
+        entries = [e for e in os.scandir(self.path) if e.is_file() and e.name.endswith(".jpg")]
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            self._entries[entry.name] = entry.stat().st_size
+            self.size += entry.stat().st_size
+        self._evict()
+
+    @staticmethod
+    def _name(file_id):
+        return hashlib.sha1(file_id.encode()).hexdigest() + ".jpg"
+
+    def get(self, file_id):
+        """Path of the cached thumbnail for ``file_id``, or None."""
+        name = self._name(file_id)
+        path = os.path.join(self.path, name)
+        if name not in self._entries or not os.path.exists(path):
+            self._forget(name)
+            return None
+        self._entries.move_to_end(name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    async def fetch(self, client, file_id):
+        """Cached thumbnail for ``file_id``, downloading and rendering it on a miss."""
+        path = self.get(file_id)
+        if path:
+            self.hits += 1
+            return path
+        self.misses += 1
+        # Jobs asking for the same thumbnail at once share a single render.
+        if file_id not in self._pending:
+            self._pending[file_id] = asyncio.ensure_future(self._render(client, file_id))
+            self._pending[file_id].add_done_callback(lambda _: self._pending.pop(file_id, None))
+        return await asyncio.shield(self._pending[file_id])
+
+    async def acquire(self, client, file_id):
+        """Like ``fetch``, but the file can't be evicted until ``release`` is called."""
+        # Pinned before anything is awaited, so a concurrent render can't evict it in between.
+        name = self._name(file_id)
+        self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            return await self.fetch(client, file_id)
+        except BaseException:
+            self.release(file_id)
+            raise
+
+    def release(self, file_id):
+        name = self._name(file_id)
+        count = self._pins.pop(name, 0) - 1
+        if count > 0:
+            self._pins[name] = count
+        else:
+            self._evict()
+
+    async def _render(self, client, file_id):
+        name = self._name(file_id)
+        path = os.path.join(self.path, name)
+        raw = await client.download_media(file_id, file_name=f"{path}.part")
+        try:
+            await run_blocking(render_thumbnail, raw, f"{path}.tmp")
+            await run_blocking(os.replace, f"{path}.tmp", path)
+        finally:
+            for leftover in (raw, f"{path}.tmp"):
+                await remove_file(leftover)
+        self._forget(name)
+        self._entries[name] = os.path.getsize(path)
+        self.size += self._entries[name]
+        self._evict(keep=name)
+        return path
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self.size -= size
+
+    def _evict(self, keep=None):
+        for name in list(self._entries):
+            if self.size <= self.max_bytes:
+                break
+            if name == keep or name in self._pins:
+                continue
+            self._forget(name)
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError as e:
+                logger.error(f"Error evicting thumbnail {name}: {e}")
+
+
+# Instantiate
+thumbnail_cache = ThumbnailCache(max_bytes=Config.THUMB_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,93 @@
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from pyrogram import Client
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def create_sessions(tokens):
+    """Extra bot sessions that only upload: no updates, no session files on disk."""
+    return [
+        Client(
+            name=f"uploader_{i}",
+            api_id=Config.API_ID,
+            api_hash=Config.API_HASH,
+            bot_token=token,
+            in_memory=True,
+            no_updates=True,
+        )
+        for i, token in enumerate(tokens, 1)
+    ]
+
+
+class UploadPool:
+    """Spreads uploads over the main bot and any extra upload sessions.
+
+    ``clients`` are the extra sessions; anything with pyrogram's ``start``,
+    ``stop`` and ``send_*`` coroutines will do, so tests can pass fakes. Each
+    upload goes to the least-loaded session, ties broken round-robin, or plain
+    round-robin with ``strategy="round_robin"``.
+    """
+
+    def __init__(self, clients=(), strategy="least_loaded"):
+        self.clients = list(clients)
+        self.strategy = strategy
+        self.uploads = {}  # id(client) -> uploads finished
+        self._load = {}  # id(client) -> uploads in progress
+        self._turn = itertools.count()
+
+    @property
+    def enabled(self):
+        return bool(self.clients)
+
+    async def start(self):
+        started = []
+        for client in self.clients:
+            try:
+                await client.start()
+                started.append(client)
+            except Exception as e:
+                logger.error(f"Upload session {getattr(client, 'name', client)} failed to start: {e}")
+        self.clients = started
+
+    async def stop(self):
+        for client in self.clients:
+            try:
+                await client.stop()
+            except Exception as e:
+                logger.error(f"Upload session {getattr(client, 'name', client)} failed to stop: {e}")
+
+    def pick(self, main):
+        candidates = [main] + self.clients
+        offset = next(self._turn) % len(candidates)
+        rotated = candidates[offset:] + candidates[:offset]
+        if self.strategy == "round_robin":
+            return rotated[0]
+        return min(rotated, key=lambda client: self._load.get(id(client), 0))
+
+    @asynccontextmanager
+    async def session(self, main):
+        """Borrow a session for one upload; ``main`` is the bot that owns the chat."""
+        client = self.pick(main)
+        key = id(client)
+        self._load[key] = self._load.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            self._load[key] -= 1
+            self.uploads[key] = self.uploads.get(key, 0) + 1
+
+    def stats(self, main):
+        return [
+            (getattr(client, "name", "main"), self._load.get(id(client), 0), self.uploads.get(id(client), 0))
+            for client in [main] + self.clients
+        ]
+
+
+# Instantiate
+upload_pool = UploadPool(
+    create_sessions(Config.UPLOAD_BOT_TOKENS) if Config.RELAY_CHANNEL else [],
+    strategy=Config.UPLOAD_POOL_STRATEGY,
+)
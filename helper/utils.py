@@ -1,41 +1,80 @@
-import math, time
+import math, time, asyncio
 from datetime import datetime
 from pytz import timezone
 from config import Config, Txt 
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from pyrogram.errors import FloodWait, MessageNotModified
 import re
 
 
-async def progress_for_pyrogram(current, total, ud_type, message, start):
-    now = time.time()
-    diff = now - start
-    if round(diff % 5.00) == 0 or current == total:        
-        percentage = current * 100 / total
+_PROGRESS_BARS = ["■" * i + "□" * (20 - i) for i in range(21)]
+_CANCEL_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("• ᴄᴀɴᴄᴇʟ •", callback_data="close")]])
+
+
+class ProgressReporter:
+    """Transfer progress for one job's status message.
+
+    Pass ``reporter.update`` as a pyrogram ``progress`` callback. Each chunk only
+    bumps counters; the message is edited in the background at most once every
+    ``interval`` seconds, never with unchanged text, and not at all while a
+    FloodWait is in force. Call ``finish`` when a transfer ends and ``stage``
+    to relabel it for the next one.
+    """
+
+    def __init__(self, message, ud_type, interval=None):
+        self.message = message
+        self.interval = Config.PROGRESS_INTERVAL if interval is None else interval
+        self.edits = 0
+        self._next_edit = 0
+        self._last_text = None
+        self._task = None
+        self.stage(ud_type)
+
+    def stage(self, ud_type):
+        self.ud_type = ud_type
+        self.start = time.time()
+        self.current = self.total = 0
+
+    def finish(self):
+        """Drop a pending edit so it can't land on top of the next status text."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def update(self, current, total, *args):
+        self.current, self.total = current, total
+        now = time.monotonic()
+        if now < self._next_edit or (self._task and not self._task.done()):
+            return
+        self._next_edit = now + self.interval
+        self._task = asyncio.create_task(self._edit())
+
+    def render(self):
+        current, total = self.current, self.total or self.current or 1
+        diff = max(time.time() - self.start, 0.001)
+        percentage = min(current * 100 / total, 100)
         speed = current / diff
-        elapsed_time = round(diff) * 1000
-        time_to_completion = round((total - current) / speed) * 1000
-        estimated_total_time = elapsed_time + time_to_completion
-
-        elapsed_time = TimeFormatter(milliseconds=elapsed_time)
-        estimated_total_time = TimeFormatter(milliseconds=estimated_total_time)
-
-        progress = "{0}{1}".format(
-            ''.join(["■" for i in range(math.floor(percentage / 5))]),
-            ''.join(["□" for i in range(20 - math.floor(percentage / 5))])
-        )            
-        tmp = progress + Txt.PROGRESS_BAR.format( 
+        eta = TimeFormatter(milliseconds=round((total - current) / speed) * 1000 if speed else 0)
+        return f"{self.ud_type}\n\n" + _PROGRESS_BARS[math.floor(percentage / 5)] + Txt.PROGRESS_BAR.format(
             round(percentage, 2),
             humanbytes(current),
             humanbytes(total),
-            humanbytes(speed),            
-            estimated_total_time if estimated_total_time != '' else "0 s"
+            humanbytes(speed),
+            eta if eta != '' else "0 s"
         )
+
+    async def _edit(self):
+        text = self.render()
+        if text == self._last_text:
+            return
         try:
-            await message.edit(
-                text=f"{ud_type}\n\n{tmp}",               
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("• ᴄᴀɴᴄᴇʟ •", callback_data="close")]])                                               
-            )
-        except:
+            await self.message.edit(text=text, reply_markup=_CANCEL_MARKUP)
+            self._last_text = text
+            self.edits += 1
+        except FloodWait as e:
+            self._next_edit = time.monotonic() + e.value
+        except MessageNotModified:
+            self._last_text = text
+        except Exception:
             pass
 
 def humanbytes(size):    
@@ -1,9 +1,15 @@
 from config import Config, Txt
 from helper.database import codeflixbots
+from helper.filename_parser import parse_cache_info
+from helper.scheduler import rename_scheduler
+from helper.stages import rename_stages
+from helper.upload_pool import upload_pool
+from helper.broadcast import start_broadcast, resume_broadcast, cancel_broadcast
+from bson import ObjectId
+from bson.errors import InvalidId
 from pyrogram.types import Message
 from pyrogram import Client, filters
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
-import os, sys, time, asyncio, logging, datetime
+import os, sys, time, asyncio, logging
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 logger = logging.getLogger(__name__)
@@ -18,11 +24,11 @@ async def restart_bot(b, m):
     global is_restarting
     if not is_restarting:
         is_restarting = True
-        await m.reply_text("**Restarting.....**")
+        await m.reply_text(f"**Restarting..... waiting up to {Config.DRAIN_TIMEOUT}s for {rename_scheduler.active} running jobs**")
 
-        # Gracefully stop the bot's event loop
+        # Gracefully stop the bot's event loop; stop() drains the rename queue first
         await b.stop()
-        time.sleep(2)  # Adjust the delay duration based on your bot's shutdown time
+        await asyncio.sleep(2)  # Adjust the delay duration based on your bot's shutdown time
 
         # Restart the bot process
         os.execl(sys.executable, sys.executable, *sys.argv)
@@ -50,49 +56,68 @@ async def get_stats(bot, message):
     st = await message.reply('**Accessing The Details.....**')    
     end_t = time.time()
     time_taken_s = (end_t - start_t) * 1000
-    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`")
+    parse_cache = parse_cache_info()
+    stages = "".join(
+        f"\n**⚙️ {name.title()} :** `{s['utilization']:.0%} busy, {s['active']} running, {s['waiting']} waiting, "
+        f"avg {s['avg_run']:.1f}s + {s['avg_wait']:.1f}s wait over {s['runs']} runs`"
+        for name, s in rename_stages.stats().items()
+    )
+    c = codeflixbots.counters.stats()
+    stages += (
+        f"\n**✍️ Counter Writes :** `{c['pending_increments']} pending for {c['pending_docs']} users, "
+        f"{c['flushes']} flushes ({c['failures']} failed), last {c['last_latency'] * 1000:.0f} ms, "
+        f"avg {c['avg_latency'] * 1000:.0f} ms, max {c['max_latency'] * 1000:.0f} ms`"
+    )
+    timings = getattr(bot, "startup_timings", {})
+    if timings:
+        stages += "\n**🚀 Startup :** `" + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()) + "`"
+    if upload_pool.enabled:
+        stages += "".join(
+            f"\n**📤 {name} :** `{active} uploading, {done} done`" for name, active, done in upload_pool.stats(bot)
+        )
+    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`"
+                       f"\n**🧠 Parse Cache :** `{parse_cache.hits} hits / {parse_cache.misses} misses`{stages}")
+
+@Client.on_message(filters.command("purge_cache") & filters.user(Config.ADMIN))
+async def purge_cache(bot, message):
+    deleted = await codeflixbots.purge_results()
+    await message.reply_text(f"**🗑️ Result Cache Purged :** `{deleted}` entries removed")
 
 @Client.on_message(filters.command("broadcast") & filters.user(Config.ADMIN) & filters.reply)
 async def broadcast_handler(bot: Client, m: Message):
     await bot.send_message(Config.LOG_CHANNEL, f"{m.from_user.mention} or {m.from_user.id} Is Started The Broadcast......")
-    all_users = await codeflixbots.get_all_users()
-    broadcast_msg = m.reply_to_message
     sts_msg = await m.reply_text("Broadcast Started..!") 
-    done = 0
-    failed = 0
-    success = 0
-    start_time = time.time()
-    total_users = await codeflixbots.total_users_count()
-    async for user in all_users:
-        sts = await send_msg(user['_id'], broadcast_msg)
-        if sts == 200:
-           success += 1
-        else:
-           failed += 1
-        if sts == 400:
-           await codeflixbots.delete_user(user['_id'])
-        done += 1
-        if not done % 20:
-           await sts_msg.edit(f"Broadcast In Progress: \n\nTotal Users {total_users} \nCompleted : {done} / {total_users}\nSuccess : {success}\nFailed : {failed}")
-    completed_in = datetime.timedelta(seconds=int(time.time() - start_time))
-    await sts_msg.edit(f"Bʀᴏᴀᴅᴄᴀꜱᴛ Cᴏᴍᴩʟᴇᴛᴇᴅ: \nCᴏᴍᴩʟᴇᴛᴇᴅ Iɴ `{completed_in}`.\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nFailed: {failed}")
-           
-async def send_msg(user_id, message):
     try:
-        await message.copy(chat_id=int(user_id))
-        return 200
-    except FloodWait as e:
-        await asyncio.sleep(e.value)
-        return send_msg(user_id, message)
-    except InputUserDeactivated:
-        logger.info(f"{user_id} : Deactivated")
-        return 400
-    except UserIsBlocked:
-        logger.info(f"{user_id} : Blocked The Bot")
-        return 400
-    except PeerIdInvalid:
-        logger.info(f"{user_id} : User ID Invalid")
-        return 400
+        runner = await start_broadcast(bot, m.chat.id, m.reply_to_message.id, sts_msg)
     except Exception as e:
-        logger.error(f"{user_id} : {e}")
-        return 500
+        return await sts_msg.edit(f"Broadcast Failed To Start: {e}")
+    await sts_msg.edit(f"Broadcast Started..!\n\nBroadcast ID : `{runner.id}`\nStop it with /cancel_broadcast")
+
+def _broadcast_id(m):
+    if len(m.command) < 2:
+        return None
+    try:
+        return ObjectId(m.command[1])
+    except InvalidId:
+        raise ValueError(f"`{m.command[1]}` is not a broadcast ID")
+
+@Client.on_message(filters.command("cancel_broadcast") & filters.user(Config.ADMIN))
+async def cancel_broadcast_handler(bot: Client, m: Message):
+    try:
+        broadcast_id = cancel_broadcast(_broadcast_id(m))
+    except ValueError as e:
+        return await m.reply_text(str(e))
+    if not broadcast_id:
+        return await m.reply_text("No Broadcast Is Running.")
+    await m.reply_text(f"Cancelling Broadcast `{broadcast_id}`... Resume it later with /resume_broadcast {broadcast_id}")
+
+@Client.on_message(filters.command("resume_broadcast") & filters.user(Config.ADMIN))
+async def resume_broadcast_handler(bot: Client, m: Message):
+    sts_msg = await m.reply_text("Resuming Broadcast..!")
+    try:
+        runner = await resume_broadcast(bot, _broadcast_id(m), sts_msg)
+    except ValueError as e:
+        return await sts_msg.edit(str(e))
+    if not runner:
+        return await sts_msg.edit("No Unfinished Broadcast To Resume.")
+    await sts_msg.edit(f"Broadcast `{runner.id}` Resumed After {runner.broadcast['done']} Users..!")
@@ -1,3 +1,11 @@
+import os
+import json
+import logging
+from pyrogram import Client, filters
+from config import Config
+from helper.executor import run_blocking
+from helper.keyword_matcher import KeywordMatcher
+
 nsfw_keywords = {
     "general": [
         "porn", "sex", "nude", "naked", "boobs", "tits", "pussy", "dick", "cock", "ass",
@@ -42,15 +50,50 @@ nsfw_keywords = {
 
 exception_keywords = ["nxivm", "classroom", "assassination", "geass"]
 
+logger = logging.getLogger(__name__)
+
+
+def load_nsfw_matcher(path=Config.NSFW_KEYWORDS_FILE):
+    """Build the matcher from the lists above, or from ``path`` when it exists: a JSON
+    object with "categories" (name -> keywords) and optionally "exceptions"."""
+    if not path or not os.path.exists(path):
+        return KeywordMatcher(nsfw_keywords, exception_keywords)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return KeywordMatcher(data["categories"], data.get("exceptions", exception_keywords))
+
+
+# Instantiate
+try:
+    nsfw_matcher = load_nsfw_matcher()
+except Exception as e:
+    logging.error(f"Error loading {Config.NSFW_KEYWORDS_FILE}, using the built-in lists: {e}")
+    nsfw_matcher = KeywordMatcher(nsfw_keywords, exception_keywords)
+
+
+def reload_nsfw_keywords(path=Config.NSFW_KEYWORDS_FILE):
+    """Swap in a freshly built matcher; the old one keeps serving if the file is broken."""
+    global nsfw_matcher
+    nsfw_matcher = load_nsfw_matcher(path)
+    return nsfw_matcher
+
+
 async def check_anti_nsfw(new_name, message):
-    lower_name = new_name.lower()
-    for keyword in exception_keywords:
-        if keyword.lower() in lower_name:
-            return False  # Allow the filename if it contains an exception keyword
-    
-    for category, keywords in nsfw_keywords.items():
-        for keyword in keywords:
-            if keyword.lower() in lower_name:
-                await message.reply_text("You can't rename files with NSFW content.")
-                return True
-    return False
+    category = nsfw_matcher.match(new_name)
+    if category is None:
+        return False
+    logger.info(f"Blocked {new_name!r} ({category})")
+    await message.reply_text("You can't rename files with NSFW content.")
+    return True
+
+
+@Client.on_message(filters.command("reload_nsfw") & filters.user(Config.ADMIN))
+async def reload_nsfw(client, message):
+    try:
+        matcher = await run_blocking(reload_nsfw_keywords)
+    except Exception as e:
+        logger.error(f"Reloading NSFW keywords failed: {e}")
+        return await message.reply_text(f"Reload failed, keeping the current list: {e}")
+    await message.reply_text(
+        f"NSFW filter reloaded: {len(matcher.keywords)} keywords in {len(matcher.categories)} categories"
+    )
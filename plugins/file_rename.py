@@ -1,18 +1,26 @@
 import os
-import re
-import time
-import shutil
+import json
+import hashlib
 import asyncio
 import logging
 from datetime import datetime
-from PIL import Image
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from hachoir.metadata import extractMetadata
 from hachoir.parser import createParser
 from plugins.antinsfw import check_anti_nsfw
-from helper.utils import progress_for_pyrogram, humanbytes, convert
+from helper.utils import ProgressReporter, humanbytes, convert
 from helper.database import codeflixbots
+from helper.scheduler import rename_scheduler
+from helper.disk_budget import disk_budget, WORK_DIRS
+from helper.filename_parser import parse_filename, episode_order
+from helper.ffmpeg import add_metadata, stream_metadata
+from helper.stage_planner import plan_stages
+from helper.thumbnail import thumbnail_cache, render_thumbnail
+from helper.executor import run_blocking, remove_file, makedirs
+from helper.batch import BatchCollector
+from helper.stages import rename_stages
+from helper.upload_pool import upload_pool
 from config import Config
 
 # Logging
@@ -21,69 +29,14 @@ logger = logging.getLogger(__name__)
 
 renaming_operations = {}
 
-# ----------------------------- Regex Patterns -----------------------------
-SEASON_EPISODE_PATTERNS = [
-    (re.compile(r'S(\d+)(?:E|EP)(\d+)'), ('season', 'episode')),
-    (re.compile(r'S(\d+)[\s-]*(?:E|EP)(\d+)'), ('season', 'episode')),
-    (re.compile(r'Season\s*(\d+)\s*Episode\s*(\d+)', re.IGNORECASE), ('season', 'episode')),
-    (re.compile(r'S(\d+)E(\d+)'), ('season', 'episode')),
-    (re.compile(r'S(\d+)[^\d]*(\d+)'), ('season', 'episode')),
-    (re.compile(r'(?:E|EP|Episode)\s*(\d+)', re.IGNORECASE), (None, 'episode')),
-    (re.compile(r'\b(\d+)\b'), (None, 'episode')),
-    (re.compile(r'\[S-(\d+)\]\s*\[E-(\d+)\]'), ('season', 'episode')),
-    (re.compile(r'\[S(\d+)\]\s*\[E(\d+)\]'), ('season', 'episode')),
-    (re.compile(r'\[Season\s*(\d+)\]\s*\[Episode\s*(\d+)\]', re.IGNORECASE), ('season', 'episode')),
-    (re.compile(r'\bS-(\d+)\b\s*\bE-(\d+)\b'), ('season', 'episode')),
-    (re.compile(r'\b(?:Ep|EP|E|-E|E-)(\d+)\b', re.IGNORECASE), (None, 'episode')),
-    (re.compile(r'\bEp-(\d+)\b', re.IGNORECASE), (None, 'episode')),
-    (re.compile(r'\bEpisode-(\d+)\b', re.IGNORECASE), (None, 'episode')),
-    (re.compile(r'\[S-(\d+)\]'), ('season', None)),
-    (re.compile(r'\[Season\s*(\d+)\]', re.IGNORECASE), ('season', None)),
-    (re.compile(r'\bS-(\d+)\b'), ('season', None)),
-]
-
-QUALITY_PATTERNS = [
-    (re.compile(r'\b(\d{3,4}[pi])\b', re.IGNORECASE), lambda m: m.group(1).lower()),
-    (re.compile(r'\[(\d{3,4}[pi])\]', re.IGNORECASE), lambda m: m.group(1).lower()),
-    (re.compile(r'\b(4k|2160p)\b', re.IGNORECASE), lambda m: "4k"),
-    (re.compile(r'\[(4k|2160p)\]', re.IGNORECASE), lambda m: "4k"),
-    (re.compile(r'\b(2k|1440p)\b', re.IGNORECASE), lambda m: "2k"),
-    (re.compile(r'\[(2k|1440p)\]', re.IGNORECASE), lambda m: "2k"),
-    (re.compile(r'\b(360p)\b', re.IGNORECASE), lambda m: "360p"),
-    (re.compile(r'\[360p\]', re.IGNORECASE), lambda m: "360p"),
-    (re.compile(r'\bSD\b', re.IGNORECASE), lambda m: "480p"),
-    (re.compile(r'\[SD\]', re.IGNORECASE), lambda m: "480p"),
-    (re.compile(r'\bHD\b', re.IGNORECASE), lambda m: "720p"),
-    (re.compile(r'\[HD\]', re.IGNORECASE), lambda m: "720p"),
-    (re.compile(r'\b(UHD|4kX264|4kx265)\b', re.IGNORECASE), lambda m: "4k"),
-    (re.compile(r'\[(UHD|4kX264|4kx265)\]', re.IGNORECASE), lambda m: "4k"),
-    (re.compile(r'\b(HDRip|HDTV)\b', re.IGNORECASE), lambda m: "720p"),
-    (re.compile(r'\b(X264|X265|HEVC)\b', re.IGNORECASE), lambda m: "1080p"),
-    (re.compile(r'(\d{3,4}[pi])', re.IGNORECASE), lambda m: m.group(1).lower()),
-]
+# Profile fields that end up inside the uploaded file; a change to any of them invalidates cached results.
+RESULT_SETTINGS = ("metadata", "title", "author", "artist", "audio", "subtitle", "video", "file_id")
 
 # ----------------------------- Helpers -----------------------------
-def extract_season_episode(filename):
-    for pattern, (season_group, episode_group) in SEASON_EPISODE_PATTERNS:
-        match = pattern.search(filename)
-        if match:
-            season = match.group(1) if season_group else None
-            episode = match.group(2) if episode_group else match.group(1) if episode_group else None
-            return season, episode
-    return None, None
-
-def extract_quality(filename):
-    for pattern, extractor in QUALITY_PATTERNS:
-        match = pattern.search(filename)
-        if match:
-            return extractor(match)
-    return "Unknown"
-
 async def cleanup_files(*paths):
     for path in paths:
         try:
-            if path and os.path.exists(path):
-                os.remove(path)
+            await remove_file(path)
         except Exception as e:
             logger.error(f"Error removing {path}: {e}")
 
@@ -91,61 +44,83 @@ async def process_thumbnail(thumb_path):
     if not thumb_path or not os.path.exists(thumb_path):
         return None
     try:
-        with Image.open(thumb_path) as img:
-            img = img.convert("RGB").resize((1280, 720))
-            img.save(thumb_path, "JPEG")
-        return thumb_path
+        return await run_blocking(render_thumbnail, thumb_path, thumb_path)
     except Exception as e:
         logger.error(f"Thumbnail processing failed: {e}")
         await cleanup_files(thumb_path)
         return None
 
-# ----------------------------- Metadata Embed -----------------------------
-async def add_metadata(input_path, output_path, user_id):
-    ffmpeg = shutil.which("ffmpeg")
-    if not ffmpeg:
-        raise RuntimeError("FFmpeg not found in PATH")
-
-    metadata = {
-        'title': await codeflixbots.get_title(user_id) or "",
-        'artist': await codeflixbots.get_artist(user_id) or "",
-        'author': await codeflixbots.get_author(user_id) or "",
-        'video_title': await codeflixbots.get_video(user_id) or "",
-        'audio_title': await codeflixbots.get_audio(user_id) or "",
-        'subtitle': await codeflixbots.get_subtitle(user_id) or ""
-    }
+def render_name(format_template, file_name):
+    season, episode, quality = parse_filename(file_name)
+
+    for ph, val in {
+        '{season}': season or 'XX',
+        '{episode}': episode or 'XX',
+        '{quality}': quality,
+        'Season': season or 'XX',
+        'Episode': episode or 'XX',
+        'QUALITY': quality
+    }.items():
+        format_template = format_template.replace(ph, val)
+    return format_template
+
+def result_key(file_unique_id, media_type, new_filename, profile):
+    settings = json.dumps({field: profile.get(field) for field in RESULT_SETTINGS}, sort_keys=True, default=str)
+    settings_hash = hashlib.sha1(settings.encode()).hexdigest()
+    return hashlib.sha1(f"{file_unique_id}|{media_type}|{new_filename}|{settings_hash}".encode()).hexdigest()
+
+async def send_media(client, media_type, path, **kwargs):
+    if media_type == "video":
+        return await client.send_video(video=path, **kwargs)
+    elif media_type == "audio":
+        return await client.send_audio(audio=path, **kwargs)
+    return await client.send_document(document=path, **kwargs)
+
+async def send_to_dump(client, message, media_type, file_id, new_filename):
+    try:
+        file_type_label = "📹 Video" if media_type == "video" else "📄 Document" if media_type == "document" else "🎵 Audio"
+        dump_caption = (
+            f"{file_type_label}\n\n👤 User: {message.from_user.mention}\n🆔 ID: `{message.from_user.id}`\n📁 File: `{new_filename}`"
+        )
+        # Re-send the file Telegram already has instead of uploading it again.
+        await client.send_cached_media(
+            chat_id=Config.DUMP_CHANNEL,
+            file_id=file_id,
+            caption=dump_caption,
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("🚫 Ban User", callback_data=f"ban_{message.from_user.id}")]
+            ])
+        )
 
-    cmd = [
-        ffmpeg, "-i", input_path,
-        "-map", "0", "-c", "copy",
-        "-map_metadata", "0",          # ✅ ensures global metadata copy
-        "-metadata", f"title={metadata['title']}",
-        "-metadata", f"artist={metadata['artist']}",
-        "-metadata", f"author={metadata['author']}",
-        "-metadata:s:v", f"title={metadata['video_title']}",
-        "-metadata:s:a", f"title={metadata['audio_title']}",
-        "-metadata:s:s", f"title={metadata['subtitle']}",
-        "-fflags", "+genpts",
-        "-reset_timestamps", "1",
-        "-avoid_negative_ts", "make_zero",
-        "-f", "matroska",             # ✅ force MKV
-        "-loglevel", "error", output_path
-    ]
-
-    process = await asyncio.create_subprocess_exec(
-        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    _, stderr = await process.communicate()
+    except Exception as dump_err:
+        logger.warning(f"Failed to send to dump channel: {dump_err}")
+
+async def serve_cached_result(client, message, key, cached, new_filename, profile):
+    """Answer with an earlier upload of the same result. Returns False if Telegram no longer has it."""
+    try:
+        await client.send_cached_media(
+            chat_id=message.chat.id,
+            file_id=cached["file_id"],
+            caption=profile["caption"] or f"**{new_filename}**"
+        )
+    except Exception as e:
+        logger.warning(f"Cached result {key} unusable, renaming again: {e}")
+        await codeflixbots.remove_result(key)
+        return False
 
-    if process.returncode != 0 or not os.path.exists(output_path):
-        raise RuntimeError(f"FFmpeg error: {stderr.decode()}")
+    try:
+        await codeflixbots.increment_rename_count(message.from_user.id)
+    except Exception as e:
+        logger.error(f"Rename count increment failed for {message.from_user.id}: {e}")
+    await send_to_dump(client, message, cached["media_type"], cached["file_id"], new_filename)
+    return True
 
 # ----------------------------- Handler -----------------------------
 @Client.on_message(filters.private & (filters.document | filters.video | filters.audio))
 async def auto_rename_files(client, message):
-    download_path = metadata_path = thumb_path = None
     user_id = message.from_user.id
-    format_template = await codeflixbots.get_format_template(user_id)
+    profile = await codeflixbots.get_user_profile(user_id)
+    format_template = profile["format_template"]
 
     if not format_template:
         return await message.reply_text("Please set a rename format using /autorename")
@@ -162,113 +137,416 @@ async def auto_rename_files(client, message):
     if await check_anti_nsfw(file_name, message):
         return await message.reply_text("NSFW content detected")
 
+    batch_key = batch_collector.window_for(user_id)
+    if not batch_key and message.media_group_id:
+        batch_key = ("album", message.media_group_id)
+
+    # Same source, same name, same embedded settings: reuse the earlier upload.
+    # Batched files are resent in their turn by the upload stage, to keep episode order.
+    media = getattr(message, media_type)
+    plan = plan_stages(profile, media_type, file_name, media.mime_type)
+    new_filename = f"{render_name(format_template, file_name)}{plan.extension}"
+    key = result_key(media.file_unique_id, media_type, new_filename, profile)
+    cached = await codeflixbots.get_result(key)
+    if cached and not batch_key and await serve_cached_result(client, message, key, cached, new_filename, profile):
+        return
+
+    if rename_scheduler.draining:
+        return await message.reply_text("**♻️ Bot is restarting, please send the file again in a minute.**")
+
     if file_id in renaming_operations:
         if (datetime.now() - renaming_operations[file_id]).seconds < 10:
             return
     renaming_operations[file_id] = datetime.now()
 
-    try:
-        season, episode = extract_season_episode(file_name)
-        quality = extract_quality(file_name)
-
-        for ph, val in {
-            '{season}': season or 'XX',
-            '{episode}': episode or 'XX',
-            '{quality}': quality,
-            'Season': season or 'XX',
-            'Episode': episode or 'XX',
-            'QUALITY': quality
-        }.items():
-            format_template = format_template.replace(ph, val)
-
-        # ✅ Force MKV for videos
-        if media_type == "video":
-            ext = ".mkv"
-        elif media_type == "audio":
-            ext = ".mp3"
-        else:
-            ext = os.path.splitext(file_name)[1] or ".bin"
+    job = RenameJob(
+        client, message, None, profile, file_id, file_name, file_size, media_type,
+        cached=(key, cached) if cached and batch_key else None
+    )
+    if batch_key:
+        job.msg = await message.reply_text("**📦 Added to batch...**")
+    else:
+        position = rename_scheduler.queue_position(user_id)
+        job.queued = bool(position)
+        job.msg = await message.reply_text(f"**⏳ You are #{position} in queue...**" if position else "**Downloading...**")
+    await codeflixbots.add_job({
+        "_id": job.job_id,
+        "user_id": user_id,
+        "chat_id": message.chat.id,
+        "message_id": message.id,
+        "status_message_id": job.msg.id,
+        "file_id": file_id,
+        "file_name": file_name,
+        "file_size": file_size,
+        "media_type": media_type,
+        "stage": "queued",
+    })
+
+    if batch_key:
+        batch_collector.add(batch_key, job)
+    else:
+        rename_scheduler.submit(user_id, lambda: process_file(job))
 
-        new_filename = f"{format_template}{ext}"
-        download_path, metadata_path = f"downloads/{new_filename}", f"metadata/{new_filename}"
-        os.makedirs(os.path.dirname(download_path), exist_ok=True)
-        os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+@Client.on_message(filters.private & filters.command("batch"))
+async def open_batch(client, message):
+    batch_collector.open_window(message.from_user.id)
+    await message.reply_text(
+        "**📦 Batch mode on.** Send your files, then /done. They'll be renamed and sent back in episode order."
+    )
 
-        msg = await message.reply_text("**Downloading...**")
-        file_path = await client.download_media(
-            message, file_name=download_path,
-            progress=progress_for_pyrogram, progress_args=("Downloading...", msg, time.time())
-        )
+@Client.on_message(filters.private & filters.command("done"))
+async def close_batch(client, message):
+    key = batch_collector.window_for(message.from_user.id)
+    if not key:
+        return await message.reply_text("**No batch is open. Start one with /batch.**")
+    count = batch_collector.close(key)
+    await message.reply_text(f"**📦 Batch closed with {count} files.**" if count else "**📦 Batch closed, it was empty.**")
+
+# ----------------------------- Job -----------------------------
+class RenameJob:
+    """One file on its way through the download, remux and upload stages.
+
+    ``resume`` is a journal entry from an earlier run whose artifacts survived;
+    the stages it already finished are skipped. ``cached`` is a (result key,
+    cached result) pair to resend instead of renaming again.
+    """
+
+    def __init__(self, client, message, msg, profile, file_id, file_name, file_size, media_type, queued=False, resume=None, cached=None):
+        self.client = client
+        self.message = message
+        self.msg = msg
+        self.profile = profile
+        self.file_id = file_id
+        self.file_name = file_name
+        self.file_size = file_size
+        self.media_type = media_type
+        self.queued = queued
+        self.resume = resume
+        self.cached = cached
+        self.job_id = f"{message.chat.id}:{message.id}"
+        self.stage = resume["stage"] if resume else "queued"
+        self.journal_stage = self.stage  # what the journal says now, i.e. what a restart resumes from
+        self.plan = None
+        self.new_filename = self.file_path = None
+        self.download_path = self.metadata_path = self.thumb_path = self.upload_thumb = None
+        self.pinned_thumb = None
+        self.reserved = 0
+        self.finished = False
+        self._progress = None
+
+    @property
+    def user_id(self):
+        return self.message.from_user.id
+
+    @property
+    def progress(self):
+        # Created on first use: batch jobs get their status message after construction.
+        if self._progress is None:
+            self._progress = ProgressReporter(self.msg, "Downloading...")
+        return self._progress
+
+
+async def download_stage(job):
+    """Name the output, plan the stages, reserve disk space and fetch the file."""
+    client, message, msg, profile = job.client, job.message, job.msg, job.profile
+    job.plan = plan = plan_stages(profile, job.media_type, job.file_name, getattr(message, job.media_type).mime_type)
+    if job.cached:
+        # Nothing to fetch: the upload stage resends the earlier result.
+        job.new_filename = f"{render_name(profile['format_template'], job.file_name)}{plan.extension}"
+        return
+    if job.resume:
+        job.new_filename, job.download_path, job.metadata_path = job.resume["new_filename"], job.resume["download_path"], job.resume["metadata_path"]
+        plan.stream = False
+    else:
+        job.new_filename = f"{render_name(profile['format_template'], job.file_name)}{plan.extension}"
+        job.download_path, job.metadata_path = f"downloads/{job.new_filename}", f"metadata/{job.new_filename}"
+    await makedirs(os.path.dirname(job.download_path))
+    await makedirs(os.path.dirname(job.metadata_path))
+    job.journal_stage = "downloading" if job.stage == "queued" else job.stage
+    await codeflixbots.update_job(
+        job.job_id, stage=job.journal_stage,
+        new_filename=job.new_filename, download_path=job.download_path, metadata_path=job.metadata_path
+    )
 
-        await msg.edit("**Processing metadata...**")
-        await add_metadata(file_path, metadata_path, user_id)
-        file_path = metadata_path
-
-        await msg.edit("**Preparing upload...**")
-        caption = await codeflixbots.get_caption(message.chat.id) or f"**{new_filename}**"
-        thumb = await codeflixbots.get_thumbnail(message.chat.id)
-
-        if thumb:
-            thumb_path = await client.download_media(thumb)
-        elif media_type == "video" and message.video.thumbs:
-            thumb_path = await client.download_media(message.video.thumbs[0].file_id)
-
-        thumb_path = await process_thumbnail(thumb_path)
-
-        await msg.edit("**Uploading...**")
-        upload_args = {
-            'chat_id': message.chat.id,
-            'caption': caption,
-            'thumb': thumb_path,
-            'progress': progress_for_pyrogram,
-            'progress_args': ("Uploading...", msg, time.time())
-        }
-
-        if media_type == "video":
-            await client.send_video(video=file_path, **upload_args)
-        elif media_type == "audio":
-            await client.send_audio(audio=file_path, **upload_args)
-        else:
-            await client.send_document(document=file_path, **upload_args)
+    # Streaming and plain uploads keep one copy on disk; download-then-remux
+    # keeps the download and the metadata copy until cleanup.
+    need = plan.disk_factor * (job.file_size or 0)
+    if not disk_budget.fits(need):
+        await msg.edit("**⏳ Waiting for free disk space...**")
+        job.queued = True
+    job.reserved = await disk_budget.reserve(need)
+
+    if job.queued and job.stage == "queued":
+        await msg.edit("**Downloading...**")
 
-        # ✅ Increment rename count
+    if job.stage == "queued" and plan.stream:
+        job.progress.stage("Downloading & processing...")
+        try:
+            await stream_metadata(client, message, job.metadata_path, profile, total=job.file_size, progress=job.progress.update)
+        except Exception as e:
+            # Some files only look streamable; retry them the seekable way.
+            logger.warning(f"Streaming remux failed for {job.file_name}, falling back to download: {e}")
+            await cleanup_files(job.metadata_path)
+            # Give back the streaming reservation before asking for the bigger one: waiting
+            # while holding it could deadlock with other jobs falling back at the same time.
+            disk_budget.release(job.reserved)
+            job.reserved = 0
+            plan.stream = False
+            job.reserved = await disk_budget.reserve(plan.disk_factor * (job.file_size or 0))
+
+    if job.stage == "uploading":
+        job.file_path = job.resume["upload_path"]
+    elif plan.stream:
+        job.file_path = job.metadata_path
+    elif job.stage == "downloaded":
+        job.file_path = job.download_path
+    else:
+        job.progress.stage("Downloading...")
+        job.file_path = await client.download_media(message, file_name=job.download_path, progress=job.progress.update)
+        await codeflixbots.update_job(job.job_id, stage="downloaded")
+        job.journal_stage = "downloaded"
+    job.progress.finish()
+
+
+async def remux_stage(job):
+    """Embed the user's metadata, unless the plan says the file goes up as it is."""
+    if job.cached:
+        return
+    if job.stage != "uploading" and not job.plan.stream:
+        if await run_blocking(job.plan.resolve, job.file_path):
+            await job.msg.edit("**Processing metadata...**")
+            await add_metadata(job.file_path, job.metadata_path, job.profile)
+            job.file_path = job.metadata_path
+    await codeflixbots.update_job(job.job_id, stage="uploading", upload_path=job.file_path)
+    job.journal_stage = "uploading"
+
+
+async def upload_stage(job):
+    client, message, msg, profile, media_type = job.client, job.message, job.msg, job.profile, job.media_type
+    if job.cached:
+        key, cached = job.cached
+        if await serve_cached_result(client, message, key, cached, job.new_filename, profile):
+            return await msg.delete()
+        # Telegram dropped the earlier upload: rename for real, still in this file's turn.
+        job.cached = None
+        await download_stage(job)
+        await remux_stage(job)
+    await msg.edit("**Preparing upload...**")
+    caption = profile["caption"] or f"**{job.new_filename}**"
+    thumb = profile["file_id"]
+
+    if thumb:
+        # Shared, pre-rendered copy: pinned while the job runs and never cleaned up by it.
         try:
-            await codeflixbots.increment_rename_count(user_id)
+            job.upload_thumb = await thumbnail_cache.acquire(client, thumb)
+            job.pinned_thumb = thumb
         except Exception as e:
-            logger.error(f"Rename count increment failed for {user_id}: {e}")
+            logger.error(f"Thumbnail processing failed: {e}")
+    elif media_type == "video" and message.video.thumbs:
+        job.thumb_path = await client.download_media(message.video.thumbs[0].file_id)
+        job.thumb_path = job.upload_thumb = await process_thumbnail(job.thumb_path)
+
+    await msg.edit("**Uploading...**")
+    job.progress.stage("Uploading...")
+    upload_args = {
+        'caption': caption,
+        'thumb': job.upload_thumb,
+        'progress': job.progress.update
+    }
+
+    async with upload_pool.session(client) as uploader:
+        if uploader is client:
+            sent = await send_media(client, media_type, job.file_path, chat_id=message.chat.id, **upload_args)
+        else:
+            # Extra sessions can't message the user: they post to the relay channel and the main bot copies it over.
+            relay = await send_media(uploader, media_type, job.file_path, chat_id=Config.RELAY_CHANNEL, **upload_args)
+            sent = await client.copy_message(message.chat.id, Config.RELAY_CHANNEL, relay.id, caption=caption)
+            try:
+                await uploader.delete_messages(Config.RELAY_CHANNEL, relay.id)
+            except Exception as e:
+                logger.warning(f"Could not delete relay post {relay.id}: {e}")
+    job.progress.finish()
+
+    # ✅ Increment rename count
+    try:
+        await codeflixbots.increment_rename_count(job.user_id)
+    except Exception as e:
+        logger.error(f"Rename count increment failed for {job.user_id}: {e}")
+
+    sent_file_id = getattr(getattr(sent, media_type, None), "file_id", None)
+    if sent_file_id:
+        # ✅ Result Cache
+        key = result_key(getattr(message, media_type).file_unique_id, media_type, job.new_filename, profile)
+        await codeflixbots.add_result(key, sent_file_id, media_type)
 
         # ✅ Dump Channel Logging
-        try:
-            file_type_label = "📹 Video" if media_type == "video" else "📄 Document" if media_type == "document" else "🎵 Audio"
-            dump_caption = (
-                f"{file_type_label}\n\n👤 User: {message.from_user.mention}\n🆔 ID: `{message.from_user.id}`\n📁 File: `{new_filename}`"
-            )
-            dump_args = {
-                "chat_id": Config.DUMP_CHANNEL,
-                "caption": dump_caption,
-                "reply_markup": InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🚫 Ban User", callback_data=f"ban_{message.from_user.id}")]
-                ])
-            }
-            if thumb_path and os.path.exists(thumb_path):
-                dump_args["thumb"] = thumb_path
-
-            if media_type == "video":
-                await client.send_video(video=file_path, **dump_args)
-            elif media_type == "audio":
-                await client.send_audio(audio=file_path, **dump_args)
-            else:
-                await client.send_document(document=file_path, **dump_args)
-
-        except Exception as dump_err:
-            logger.warning(f"Failed to send to dump channel: {dump_err}")
-
-        await msg.delete()
+        await send_to_dump(client, message, media_type, sent_file_id, job.new_filename)
+
+    await msg.delete()
+
+
+RENAME_STAGES = (download_stage, remux_stage, upload_stage)
+
+
+async def fail_job(job, e):
+    logger.error(f"❌ Processing error: {e}")
+    await job.message.reply_text(f"Error: {e}")
+
+
+async def interrupt_job(job):
+    # Only these stages leave something recover_jobs can pick up again.
+    if job.journal_stage in ("queued", "downloaded", "uploading"):
+        text = "**♻️ Bot is restarting, your file will resume shortly...**"
+    else:
+        text = "**♻️ Bot is restarting, please send this file again in a minute.**"
+    try:
+        await job.msg.edit(text)
+    except Exception:
+        pass
+
+
+async def finish_job(job, keep_artifacts=False):
+    """Release what the job holds. Interrupted jobs keep their artifacts and journal entry for recovery."""
+    if job.finished:
+        return
+    job.finished = True
+    job.progress.finish()
+    if not keep_artifacts:
+        await cleanup_files(job.download_path, job.metadata_path, job.thumb_path)
+        await codeflixbots.remove_job(job.job_id)
+    disk_budget.release(job.reserved)
+    if job.pinned_thumb:
+        thumbnail_cache.release(job.pinned_thumb)
+    renaming_operations.pop(job.file_id, None)
+
+
+async def process_file(job):
+    keep_artifacts = False
+    try:
+        # Download, remux and upload each wait for their own resource; a user's
+        # next file can download while this one is in ffmpeg or uploading.
+        await rename_stages.run(job.user_id, [(stage, job) for stage in RENAME_STAGES])
 
     except Exception as e:
-        logger.error(f"❌ Processing error: {e}")
-        await message.reply_text(f"Error: {e}")
+        await fail_job(job, e)
+
+    except asyncio.CancelledError:
+        keep_artifacts = True
+        await interrupt_job(job)
+        raise
 
     finally:
-        await cleanup_files(download_path, metadata_path, thumb_path)
-        renaming_operations.pop(file_id, None)
\ No newline at end of file
+        await finish_job(job, keep_artifacts)
+
+# ----------------------------- Batch -----------------------------
+async def process_batch(jobs):
+    """Rename a batch as a pipeline: while one file uploads the next is remuxed
+    and the one after that downloads. The staged executor keeps a user's jobs in
+    the order they entered it, so starting them in episode order is enough."""
+    jobs.sort(key=lambda job: episode_order(job.file_name))
+    await asyncio.gather(*(process_file(job) for job in jobs))
+
+async def start_batch(jobs):
+    user_id = jobs[0].user_id
+    position = rename_scheduler.queue_position(user_id)
+    for job in jobs:
+        job.queued = bool(position)
+        try:
+            await job.msg.edit(f"**⏳ Batch of {len(jobs)} files, #{position} in queue...**" if position else "**⏳ Batch starting...**")
+        except Exception:
+            pass
+    try:
+        rename_scheduler.submit(user_id, lambda: process_batch(jobs))
+    except RuntimeError as e:
+        # Draining: the jobs stay journaled as queued and are picked up on the next start.
+        logger.warning(f"Batch for user {user_id} not started: {e}")
+
+batch_collector = BatchCollector(start_batch, debounce=Config.BATCH_DEBOUNCE, window_timeout=Config.BATCH_WINDOW_TIMEOUT)
+
+# ----------------------------- Recovery -----------------------------
+def _artifact_intact(job):
+    stage = job.get("stage")
+    if stage == "queued":
+        return True
+    if stage == "downloaded":
+        path = job.get("download_path")
+        return bool(path) and os.path.exists(path) and os.path.getsize(path) == job.get("file_size")
+    if stage == "uploading":
+        path = job.get("upload_path")
+        return bool(path) and os.path.exists(path)
+    # Interrupted mid-transfer or mid-remux: whatever is on disk is partial.
+    return False
+
+
+def _remove_orphans(keep):
+    for directory in WORK_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and os.path.abspath(entry.path) not in keep:
+                try:
+                    os.remove(entry.path)
+                    logger.info(f"Removed orphaned artifact {entry.path}")
+                except Exception as e:
+                    logger.error(f"Error removing {entry.path}: {e}")
+
+
+async def _resume_job(client, job):
+    if not await run_blocking(_artifact_intact, job):
+        return False
+    message = await client.get_messages(job["chat_id"], job["message_id"])
+    if not message or message.empty or not getattr(message, job["media_type"], None):
+        return False
+    profile = await codeflixbots.get_user_profile(job["user_id"])
+    if not profile["format_template"]:
+        return False
+
+    msg = await message.reply_text("**♻️ Resuming your file after a restart...**")
+    renaming_operations[job["file_id"]] = datetime.now()
+    rename_job = RenameJob(
+        client, message, msg, profile, job["file_id"], job["file_name"], job["file_size"], job["media_type"],
+        queued=True, resume=None if job["stage"] == "queued" else job
+    )
+    rename_scheduler.submit(job["user_id"], lambda: process_file(rename_job))
+    return True
+
+
+async def sweep_artifacts():
+    """Delete work files no journaled job can resume from. Runs before the bot
+    connects, so no job of this run is writing to the work dirs yet. If the
+    journal can't be read this raises and nothing is deleted."""
+    keep = set()
+    for job in await codeflixbots.get_jobs(strict=True):
+        if await run_blocking(_artifact_intact, job):
+            keep.update(os.path.abspath(job[key]) for key in ("download_path", "metadata_path", "upload_path") if job.get(key))
+    await run_blocking(_remove_orphans, keep)
+
+
+async def recover_jobs(client):
+    """Resume or clean up the jobs journaled by a previous run."""
+    for job in await codeflixbots.get_jobs():
+        try:
+            resumed = await _resume_job(client, job)
+        except Exception as e:
+            logger.error(f"Error recovering job {job['_id']}: {e}")
+            resumed = False
+
+        try:
+            await client.delete_messages(job["chat_id"], job["status_message_id"])
+        except Exception:
+            pass
+
+        if resumed:
+            logger.info(f"Resuming job {job['_id']} from stage {job['stage']}")
+            continue
+
+        # Only this job's own files: new jobs may already be writing next to them.
+        await cleanup_files(*(job.get(key) for key in ("download_path", "metadata_path", "upload_path")))
+        await codeflixbots.remove_job(job["_id"])
+        try:
+            await client.send_message(
+                job["chat_id"],
+                f"**⚠️ Renaming `{job['file_name']}` was interrupted by a restart. Please send the file again.**"
+            )
+        except Exception as e:
+            logger.warning(f"Could not notify {job['chat_id']} about job {job['_id']}: {e}")
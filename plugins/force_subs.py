@@ -1,32 +1,47 @@
 import os
+import asyncio
+import logging
 from pyrogram import Client, filters
+from pyrogram.enums import ChatMemberStatus
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 from pyrogram.errors import UserNotParticipant
+from helper.cache import TTLCache
 from config import Config
 
 FORCE_SUB_CHANNELS = Config.FORCE_SUB_CHANNELS
 IMAGE_URL = "https://images.app.goo.gl/RhKXJvjHX2mvWmNw6"
+NOT_JOINED = {ChatMemberStatus.LEFT, ChatMemberStatus.BANNED}
+
+# (user_id, channel) -> joined? Members are cached for FSUB_CACHE_TTL, non-members
+# for the shorter FSUB_NEGATIVE_TTL so joining is noticed quickly.
+membership_cache = TTLCache(maxsize=Config.FSUB_CACHE_SIZE, ttl=Config.FSUB_CACHE_TTL)
+
+async def is_member(client, channel, user_id):
+    joined = membership_cache.get((user_id, channel))
+    if joined is not None:
+        return joined
+    try:
+        member = await client.get_chat_member(channel, user_id)
+        joined = member.status not in NOT_JOINED
+    except UserNotParticipant:
+        joined = False
+    except Exception as e:
+        # Misconfigured channel or API trouble: don't lock users out over it.
+        logging.error(f"Error checking {user_id} in {channel}: {e}")
+        return True
+    membership_cache.set((user_id, channel), joined, ttl=None if joined else Config.FSUB_NEGATIVE_TTL)
+    return joined
+
+async def get_not_joined_channels(client, user_id):
+    joined = await asyncio.gather(*(is_member(client, channel, user_id) for channel in FORCE_SUB_CHANNELS))
+    return [channel for channel, is_joined in zip(FORCE_SUB_CHANNELS, joined) if not is_joined]
 
 async def not_subscribed(_, __, message):
-    for channel in FORCE_SUB_CHANNELS:
-        try:
-            user = await message._client.get_chat_member(channel, message.from_user.id)
-            if user.status in {"kicked", "left"}:
-                return True
-        except UserNotParticipant:
-            return True
-    return False
+    return bool(await get_not_joined_channels(message._client, message.from_user.id))
 
 @Client.on_message(filters.private & filters.create(not_subscribed))
 async def forces_sub(client, message):
-    not_joined_channels = []
-    for channel in FORCE_SUB_CHANNELS:
-        try:
-            user = await client.get_chat_member(channel, message.from_user.id)
-            if user.status in {"kicked", "left"}:
-                not_joined_channels.append(channel)
-        except UserNotParticipant:
-            not_joined_channels.append(channel)
+    not_joined_channels = await get_not_joined_channels(client, message.from_user.id)
 
     buttons = [
         [
@@ -54,15 +69,10 @@ async def forces_sub(client, message):
 @Client.on_callback_query(filters.regex("check_subscription"))
 async def check_subscription(client, callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    not_joined_channels = []
-
+    # The user says they joined: ask Telegram again instead of trusting the cache.
     for channel in FORCE_SUB_CHANNELS:
-        try:
-            user = await client.get_chat_member(channel, user_id)
-            if user.status in {"kicked", "left"}:
-                not_joined_channels.append(channel)
-        except UserNotParticipant:
-            not_joined_channels.append(channel)
+        membership_cache.pop((user_id, channel))
+    not_joined_channels = await get_not_joined_channels(client, user_id)
 
     if not not_joined_channels:
         new_text = "**ʏᴏᴜ ʜᴀᴠᴇ ᴊᴏɪɴᴇᴅ ᴀʟʟ ᴛʜᴇ ʀᴇǫᴜɪʀᴇᴅ ᴄʜᴀɴɴᴇʟs. ᴛʜᴀɴᴋ ʏᴏᴜ! 😊 /start ɴᴏᴡ**"
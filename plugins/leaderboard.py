@@ -45,11 +45,8 @@ async def clear_leaderboard_handler(client, message):
     # ⚠️ Confirmation sent (optional — can be removed if not needed)
     await message.reply_text("🧹 Clearing leaderboard...")
 
-    try:
-        await codeflixbots.col.update_many(
-            {"rename_count": {"$gt": 0}},
-            {"$set": {"rename_count": 0}}
-        )
+    # Through the database helper, so the in-memory leaderboard is cleared too.
+    if await codeflixbots.reset_leaderboard():
         await message.reply_text("✅ Leaderboard cleared successfully!")
-    except Exception as e:
-        await message.reply_text(f"❌ Failed to clear leaderboard:\n`{e}`")
\ No newline at end of file
+    else:
+        await message.reply_text("❌ Failed to clear leaderboard, see the logs.")
\ No newline at end of file
@@ -3,29 +3,22 @@ from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 from config import Txt
 
-@Client.on_message(filters.command("metadata"))
-async def metadata(client, message):
-    user_id = message.from_user.id
-
-    # Fetch user metadata from the database
-    current = await db.get_metadata(user_id)
-    title = await db.get_title(user_id)
-    author = await db.get_author(user_id)
-    artist = await db.get_artist(user_id)
-    video = await db.get_video(user_id)
-    audio = await db.get_audio(user_id)
-    subtitle = await db.get_subtitle(user_id)
-
-    # Display the current metadata
+METADATA_FIELDS = ["metadata", "title", "author", "artist", "audio", "subtitle", "video"]
+
+
+def metadata_screen(settings):
+    """Text and buttons of the /metadata screen for one ``get_settings`` result."""
+    current = settings["metadata"]
+    not_found = 'Nᴏᴛ ꜰᴏᴜɴᴅ'
     text = f"""
 **㊋ Yᴏᴜʀ Mᴇᴛᴀᴅᴀᴛᴀ ɪꜱ ᴄᴜʀʀᴇɴᴛʟʏ: {current}**
 
-**◈ Tɪᴛʟᴇ ▹** `{title if title else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aᴜᴛʜᴏʀ ▹** `{author if author else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aʀᴛɪꜱᴛ ▹** `{artist if artist else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aᴜᴅɪᴏ ▹** `{audio if audio else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Sᴜʙᴛɪᴛʟᴇ ▹** `{subtitle if subtitle else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Vɪᴅᴇᴏ ▹** `{video if video else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
+**◈ Tɪᴛʟᴇ ▹** `{settings['title'] or not_found}`  
+**◈ Aᴜᴛʜᴏʀ ▹** `{settings['author'] or not_found}`  
+**◈ Aʀᴛɪꜱᴛ ▹** `{settings['artist'] or not_found}`  
+**◈ Aᴜᴅɪᴏ ▹** `{settings['audio'] or not_found}`  
+**◈ Sᴜʙᴛɪᴛʟᴇ ▹** `{settings['subtitle'] or not_found}`  
+**◈ Vɪᴅᴇᴏ ▹** `{settings['video'] or not_found}`  
     """
 
     # Inline buttons to toggle metadata
@@ -38,8 +31,14 @@ async def metadata(client, message):
             InlineKeyboardButton("How to Set Metadata", callback_data="metainfo")
         ]
     ]
-    keyboard = InlineKeyboardMarkup(buttons)
+    return text, InlineKeyboardMarkup(buttons)
+
 
+@Client.on_message(filters.command("metadata"))
+async def metadata(client, message):
+    # One cached, projected read for the whole screen
+    settings = await db.get_settings(message.from_user.id, METADATA_FIELDS)
+    text, keyboard = metadata_screen(settings)
     await message.reply_text(text=text, reply_markup=keyboard, disable_web_page_preview=True)
 
 
@@ -49,9 +48,9 @@ async def metadata_callback(client, query: CallbackQuery):
     data = query.data
 
     if data == "on_metadata":
-        await db.set_metadata(user_id, "On")
+        await db.update_settings(user_id, metadata="On")
     elif data == "off_metadata":
-        await db.set_metadata(user_id, "Off")
+        await db.update_settings(user_id, metadata="Off")
     elif data == "metainfo":
         await query.message.edit_text(
             text=Txt.META_TXT,
@@ -65,38 +64,10 @@ async def metadata_callback(client, query: CallbackQuery):
         )
         return
 
-    # Fetch updated metadata after toggling
-    current = await db.get_metadata(user_id)
-    title = await db.get_title(user_id)
-    author = await db.get_author(user_id)
-    artist = await db.get_artist(user_id)
-    video = await db.get_video(user_id)
-    audio = await db.get_audio(user_id)
-    subtitle = await db.get_subtitle(user_id)
-
-    # Updated metadata message after toggle
-    text = f"""
-**㊋ Yᴏᴜʀ Mᴇᴛᴀᴅᴀᴛᴀ ɪꜱ ᴄᴜʀʀᴇɴᴛʟʏ: {current}**
-
-**◈ Tɪᴛʟᴇ ▹** `{title if title else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aᴜᴛʜᴏʀ ▹** `{author if author else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aʀᴛɪꜱᴛ ▹** `{artist if artist else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Aᴜᴅɪᴏ ▹** `{audio if audio else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Sᴜʙᴛɪᴛʟᴇ ▹** `{subtitle if subtitle else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-**◈ Vɪᴅᴇᴏ ▹** `{video if video else 'Nᴏᴛ ꜰᴏᴜɴᴅ'}`  
-    """
-
-    # Update inline buttons
-    buttons = [
-        [
-            InlineKeyboardButton(f"On{' ✅' if current == 'On' else ''}", callback_data='on_metadata'),
-            InlineKeyboardButton(f"Off{' ✅' if current == 'Off' else ''}", callback_data='off_metadata')
-        ],
-        [
-            InlineKeyboardButton("How to Set Metadata", callback_data="metainfo")
-        ]
-    ]
-    await query.message.edit_text(text=text, reply_markup=InlineKeyboardMarkup(buttons), disable_web_page_preview=True)
+    # The toggle patched the cached profile, so this re-render needs no query
+    settings = await db.get_settings(user_id, METADATA_FIELDS)
+    text, keyboard = metadata_screen(settings)
+    await query.message.edit_text(text=text, reply_markup=keyboard, disable_web_page_preview=True)
 
 
 @Client.on_message(filters.private & filters.command('settitle'))
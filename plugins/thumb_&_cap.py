@@ -1,5 +1,7 @@
+import logging
 from pyrogram import Client, filters 
 from helper.database import codeflixbots
+from helper.thumbnail import thumbnail_cache
 
 @Client.on_message(filters.private & filters.command('set_caption'))
 async def add_caption(client, message):
@@ -43,4 +45,9 @@ async def removethumb(client, message):
 async def addthumbs(client, message):
     mkn = await message.reply_text("Please Wait ...")
     await codeflixbots.set_thumbnail(message.from_user.id, file_id=message.photo.file_id)                
+    # Render it now so renames find it ready in the cache.
+    try:
+        await thumbnail_cache.fetch(client, message.photo.file_id)
+    except Exception as e:
+        logging.error(f"Error pre-rendering thumbnail for user {message.from_user.id}: {e}")
     await mkn.edit("**Thumbnail Saved Successfully ✅️**")